@@ -0,0 +1,219 @@
+import asyncio
+import math
+import time
+
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from starlette.routing import compile_path
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_REJECTED, ADMISSION_WAITING
+from app.core.security import ALGORITHM
+
+# Routes that aggregate over whole collections, as path templates
+# ({rest:path} covers a whole prefix). Everything else is cheap CRUD and
+# gets the "default" class, so a hammered report can never take the
+# slots payments and orders need.
+HEAVY_ROUTES = (
+    "/dashboard/{rest:path}",
+    "/expenses/monthly-summary",
+    "/expenses/pivot",
+    "/owners/profit-distribution",
+    "/owners/{owner_id}/ledger",
+    "/payments/aging",
+    "/payments/customer-summary",
+    "/customers/import",
+    "/customers/{customer_id}/overview",
+    "/orders/board",
+    "/orders/workload",
+    "/employees/payroll",
+    "/employees/stats/refresh",
+    "/search/",
+    "/admin/{rest:path}",
+)
+
+# Never queued or limited: probes, scrapes and cached photo files
+EXEMPT_ROUTES = ("/", "/health", "/metrics", "/static/{rest:path}")
+
+# Token bucket cost per request, by route class
+REQUEST_COST = {"heavy": 5, "default": 1}
+
+MAX_BUCKETS = 10_000
+
+
+def compile_routes(templates) -> list:
+    return [compile_path(t)[0] for t in templates]
+
+
+_heavy = compile_routes(HEAVY_ROUTES)
+_exempt = compile_routes(EXEMPT_ROUTES)
+
+
+def route_class(path: str) -> str | None:
+    """Class of the route a path will hit (None = exempt).
+
+    Admission runs before routing, so the path is matched against the
+    templates above directly.
+    """
+    if any(r.match(path) for r in _exempt):
+        return None
+    if any(r.match(path) for r in _heavy):
+        return "heavy"
+    return "default"
+
+
+class Saturated(Exception):
+    pass
+
+
+class ClassLimiter:
+    """At most `limit` requests running, `queue` more waiting up to a timeout."""
+
+    def __init__(self, name: str, limit: int, queue: int):
+        self.limit = limit
+        self.queue = queue
+        self.running = 0
+        self.waiting = 0
+        self._released = asyncio.Condition()
+        self._waiting_gauge = ADMISSION_WAITING.labels(name)
+
+    async def acquire(self, timeout: float):
+        if self.running < self.limit and self.waiting == 0:
+            self.running += 1
+            return
+        if self.waiting >= self.queue:
+            raise Saturated("queue full")
+
+        self.waiting += 1
+        self._waiting_gauge.inc()
+        try:
+            async with self._released:
+                await asyncio.wait_for(
+                    self._released.wait_for(lambda: self.running < self.limit),
+                    timeout
+                )
+                self.running += 1
+        except asyncio.TimeoutError:
+            raise Saturated("queue timeout")
+        finally:
+            self.waiting -= 1
+            self._waiting_gauge.dec()
+
+    async def release(self):
+        self.running -= 1
+        # Wake every waiter: one that was notified but has just timed out
+        # (or been cancelled) would otherwise swallow the only wake-up
+        # while the slot stays free. Waiters re-check, so one takes it.
+        async with self._released:
+            self._released.notify_all()
+
+
+class TokenBuckets:
+    """Per-client token buckets: `rate` tokens a second, up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # key -> (tokens, updated_at)
+
+    def take(self, key: str, cost: float) -> float:
+        """Spend `cost` tokens; returns 0, or seconds until it could."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+
+        self._buckets[key] = (tokens - cost, now)
+        if len(self._buckets) > MAX_BUCKETS:
+            self._prune(now)
+        return 0
+
+    def _prune(self, now: float):
+        # Buckets that have refilled are indistinguishable from new ones
+        full_after = self.burst / self.rate
+        self._buckets = {
+            k: v for k, v in self._buckets.items() if now - v[1] < full_after
+        }
+
+
+def client_key(scope) -> str:
+    """Signed-in username when the token is valid, client IP otherwise.
+
+    Only the signature is checked (no database lookup); the route's own
+    get_current_user still does the real authentication.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode().partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    payload = jwt.decode(
+                        token, settings.silaibook_secret_key, algorithms=[ALGORITHM]
+                    )
+                    if payload.get("sub"):
+                        return f"user:{payload['sub']}"
+                except JWTError:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """Load shedding in front of the threadpool.
+
+    Each route class has its own concurrency limit and bounded wait
+    queue; a request that can't get a slot within ADMISSION_QUEUE_TIMEOUT
+    is answered 503 right away instead of waiting for a thread. Per-client
+    token buckets answer 429 when one client sends more than its share.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = {
+            name: ClassLimiter(name, limit, settings.ADMISSION_QUEUE.get(name, 0))
+            for name, limit in settings.ADMISSION_LIMITS.items()
+        }
+        self.buckets = TokenBuckets(settings.ADMISSION_CLIENT_RATE, settings.ADMISSION_CLIENT_BURST)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(scope["path"])
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.buckets.take(client_key(scope), REQUEST_COST.get(name, 1))
+        if wait:
+            ADMISSION_REJECTED.labels(name, "client_rate").inc()
+            await reject(429, "Too many requests, slow down", wait)(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire(settings.ADMISSION_QUEUE_TIMEOUT)
+        except Saturated as exc:
+            ADMISSION_REJECTED.labels(name, str(exc).replace(" ", "_")).inc()
+            await reject(503, "Server busy, try again shortly", settings.ADMISSION_RETRY_AFTER)(
+                scope, receive, send
+            )
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await limiter.release()
@@ -5,6 +5,7 @@ from jose import jwt, JWTError
 from app.core.security import ALGORITHM
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.tracing import tracer
 
 security = HTTPBearer()
 
@@ -12,8 +13,12 @@ security = HTTPBearer()
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
-    token = credentials.credentials
+    with tracer.start_as_current_span("auth.get_current_user"):
+        return user_from_token(credentials.credentials)
 
+
+def user_from_token(token: str):
+    """Resolve a bearer token to a user (also used outside of Depends)."""
     try:
         payload = jwt.decode(
             token,
@@ -38,3 +43,14 @@ def get_current_user(
         "username": user["username"],
         "role": user.get("role", "admin"),
     }
+
+
+def is_admin(user: dict) -> bool:
+    """Diagnostics access comes from the ADMIN_USERNAMES allowlist only."""
+    return user["username"] in settings.ADMIN_USERNAMES
+
+
+def get_admin_user(user: dict = Depends(get_current_user)):
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
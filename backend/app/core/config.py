@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -6,6 +7,93 @@ class Settings(BaseSettings):
     DB_NAME: str
     silaibook_secret_key: str
 
+    # Customer photos
+    PHOTO_DIR: str = "app/static/photos"
+    PHOTO_MAX_BYTES: int = 5 * 1024 * 1024
+    PHOTO_WORKERS: int = 2
+    PHOTO_STORAGE: str = "local"  # local / s3
+
+    # S3-compatible object storage (PHOTO_STORAGE=s3)
+    S3_BUCKET: str = "silaibook-photos"
+    S3_PREFIX: str = "photos/"
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PRESIGN_EXPIRES: int = 3600
+    S3_MAX_POOL_CONNECTIONS: int = 20
+
+    # Prometheus /metrics and the per-route / per-collection timings
+    METRICS_ENABLED: bool = True
+
+    # Per-request Mongo query counting (Server-Timing header + budget log).
+    # QUERY_BUDGETS overrides the default per route, e.g.
+    # {"POST /orders/": 12}
+    QUERY_PROFILER_ENABLED: bool = True
+    QUERY_BUDGET: int = 20
+    QUERY_BUDGETS: Dict[str, int] = {}
+
+    # Slow query log: commands slower than SLOW_QUERY_MS go to the capped
+    # slow_queries collection; a sample of them is explained
+    SLOW_QUERY_ENABLED: bool = True
+    SLOW_QUERY_MS: int = 200
+    SLOW_QUERY_EXPLAIN_RATE: float = 0.2
+    SLOW_QUERY_EXAMINED_RATIO: int = 100  # docs examined per doc returned
+    SLOW_QUERY_LOG_BYTES: int = 16 * 1024 * 1024
+
+    # Usernames allowed to use /admin (slow queries, profiles, heap) and
+    # request profiling. Roles can't grant this: /auth/register makes
+    # every new account an owner. Empty = nobody. As an env var it is a
+    # JSON list: ADMIN_USERNAMES='["shantanu"]'
+    ADMIN_USERNAMES: List[str] = []
+
+    # Admin-triggered request profiling (X-Profile: 1) and heap snapshots
+    PROFILING_ENABLED: bool = True
+    PROFILE_INTERVAL_MS: float = 2
+    PROFILE_MAX_SECONDS: int = 30
+    PROFILE_LOG_BYTES: int = 32 * 1024 * 1024
+
+    # OpenTelemetry tracing (needs opentelemetry-sdk). Spans go to a JSON
+    # lines file, or to an OTLP/HTTP collector with TRACING_EXPORTER=otlp
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.05
+    TRACING_EXPORTER: str = "file"  # file / otlp
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "silaibook-api"
+
+    # Password hashing runs in its own process pool
+    BCRYPT_ROUNDS: int = 12  # changing it rehashes passwords on next login
+    BCRYPT_WORKERS: int = 2
+    BCRYPT_MAX_PENDING: int = 16  # hashes running + queued before 503
+
+    # Failed sign-in throttling (per username and per client IP)
+    LOGIN_ATTEMPT_WINDOW: int = 15 * 60  # seconds
+    LOGIN_MAX_FAILURES_PER_USER: int = 5
+    LOGIN_MAX_FAILURES_PER_IP: int = 30
+
+    # Admission control: concurrent requests per route class ("heavy"
+    # reports vs "default" CRUD), kept under the 40-thread threadpool,
+    # plus a bounded wait queue per class
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: Dict[str, int] = {"heavy": 4, "default": 32}
+    ADMISSION_QUEUE: Dict[str, int] = {"heavy": 8, "default": 64}
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0  # seconds in the queue before 503
+    ADMISSION_RETRY_AFTER: int = 2
+    # Per-client token bucket (heavy requests cost 5 tokens, others 1)
+    ADMISSION_CLIENT_RATE: float = 10  # tokens per second
+    ADMISSION_CLIENT_BURST: float = 40
+
+    # Total Mongo time per request, by admission route class (seconds);
+    # exceeding it returns 504. Overrides are keyed by path.
+    MONGO_TIMEOUTS_ENABLED: bool = True
+    MONGO_TIMEOUTS: Dict[str, float] = {"heavy": 20.0, "default": 5.0}
+    MONGO_TIMEOUT_OVERRIDES: Dict[str, float] = {
+        "/customers/import": 300.0,
+        "/employees/stats/refresh": 120.0,
+        "/employees/payroll/settle": 60.0,
+    }
+
     class Config:
         env_file = ".env"
 
@@ -1,8 +1,92 @@
+import os
+import threading
+
 from pymongo import MongoClient
 from app.core.config import settings
 
-client = MongoClient(settings.MONGO_URI)
-db = client[settings.DB_NAME]
+# The client is built on first use rather than at import: importing the
+# app stays cheap, and under a pre-forking server (gunicorn) each worker
+# opens its own pool after the fork instead of inheriting the master's
+# sockets and monitor threads, which pymongo does not support.
+_client: MongoClient | None = None
+_client_pid: int | None = None
+_supports_transactions: bool | None = None
+_lock = threading.Lock()
+
+
+def build_event_listeners() -> list:
+    event_listeners = []
+    if settings.METRICS_ENABLED:
+        from app.core.metrics import mongo_listeners
+        event_listeners = mongo_listeners()
+    if settings.QUERY_PROFILER_ENABLED:
+        from app.core.query_budget import QueryBudgetListener
+        event_listeners.append(QueryBudgetListener())
+    if settings.SLOW_QUERY_ENABLED:
+        from app.core.slow_queries import SlowQueryListener
+        event_listeners.append(SlowQueryListener())
+    if settings.MONGO_TIMEOUTS_ENABLED:
+        from app.core.query_timeouts import InflightCommandListener
+        event_listeners.append(InflightCommandListener())
+    if settings.TRACING_ENABLED:
+        from app.core.tracing import MongoTracingListener
+        event_listeners.append(MongoTracingListener())
+    return event_listeners
+
+
+def get_client() -> MongoClient:
+    """This process's MongoClient, created on first call (and again after a fork)."""
+    global _client, _client_pid, _supports_transactions
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != pid:
+            # connect=False: no server monitoring until the first command
+            _client = MongoClient(
+                settings.MONGO_URI, event_listeners=build_event_listeners(), connect=False
+            )
+            _client_pid = pid
+            _supports_transactions = None
+
+            if settings.METRICS_ENABLED:
+                from app.core.metrics import MONGO_POOL_MAX_SIZE
+                MONGO_POOL_MAX_SIZE.set(_client.options.pool_options.max_pool_size)
+    return _client
+
+
+def close_client():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
 
 def get_db():
-    return db
+    return get_client()[settings.DB_NAME]
+
+
+def supports_transactions() -> bool:
+    """True on replica sets and mongos; a standalone mongod has no transactions."""
+    global _supports_transactions
+    if _supports_transactions is None:
+        hello = get_client().admin.command("hello")
+        _supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _supports_transactions
+
+
+def run_transaction(callback):
+    """Run callback(session) as one transaction and return its result.
+
+    Writes that must land together (a payment and its order balance) go
+    through here. On a standalone server, as in local development, the
+    callback runs with session=None and the writes are applied one after
+    another; scripts/backfill_order_payments.py repairs any drift.
+    """
+    if not supports_transactions():
+        return callback(None)
+    with get_client().start_session() as session:
+        return session.with_transaction(callback)
@@ -0,0 +1,158 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.profiling import PROFILE_COLLECTION
+from app.core.slow_queries import SLOW_QUERY_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+# Weighted text indexes backing the global /search endpoint.
+# MongoDB allows a single text index per collection, so every searchable
+# field of a collection must live in the same index.
+TEXT_INDEXES = {
+    "orders": {
+        "fields": ["order_number", "customer_name", "customer_mobile", "order_type"],
+        "weights": {"order_number": 10, "customer_mobile": 8, "customer_name": 5, "order_type": 2},
+    },
+    "customers": {
+        "fields": ["name", "mobile"],
+        "weights": {"mobile": 8, "name": 5},
+    },
+    "payments": {
+        "fields": ["customer_name"],
+        "weights": {"customer_name": 1},
+    },
+    "cloth_stock": {
+        "fields": ["cloth_type", "dealer_name"],
+        "weights": {"cloth_type": 5, "dealer_name": 3},
+    },
+}
+
+
+# Legacy customers may have no mobile (missing or null); they are left out
+# of the unique index instead of all colliding on null
+MOBILE_PRESENT = {"mobile": {"$type": "string"}}
+
+
+def customer_mobile_duplicates(db, limit: int = 5) -> list:
+    return [
+        group["_id"] for group in db.customers.aggregate([
+            {"$match": MOBILE_PRESENT},
+            {"$group": {"_id": "$mobile", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": limit},
+        ], allowDiskUse=True)
+    ]
+
+
+def ensure_unique_mobile(db):
+    """Make customers.mobile_1 unique, if the data allows it.
+
+    Older databases have a non-unique mobile_1 and may already hold
+    duplicate mobiles (update_customer never checked them). Mongo won't
+    change an index's options in place, so the old one is dropped and
+    rebuilt, but only when there are no duplicates; otherwise it is left
+    alone and scripts/dedupe_customers.py has to merge them first. The
+    routes check for duplicates themselves too, so they stay protected
+    either way.
+    """
+    current = db.customers.index_information().get("mobile_1")
+    if current and current.get("unique"):
+        return
+
+    duplicates = customer_mobile_duplicates(db)
+    if duplicates:
+        logger.error(
+            "customers.mobile is not unique yet (e.g. %s); run scripts/dedupe_customers.py",
+            ", ".join(map(str, duplicates))
+        )
+        if not current:
+            db.customers.create_index([("mobile", ASCENDING)])
+        return
+
+    if current:
+        db.customers.drop_index("mobile_1")
+    try:
+        db.customers.create_index(
+            [("mobile", ASCENDING)], unique=True, partialFilterExpression=MOBILE_PRESENT
+        )
+    except OperationFailure as exc:
+        # A duplicate slipped in between the check and the build
+        logger.error("Could not build the unique customers.mobile index: %s", exc)
+        db.customers.create_index([("mobile", ASCENDING)])
+
+
+def ensure_indexes():
+    db = get_db()
+
+    for collection, spec in TEXT_INDEXES.items():
+        db[collection].create_index(
+            [(field, TEXT) for field in spec["fields"]],
+            weights=spec["weights"],
+            name=f"{collection}_search",
+            default_language="none",
+        )
+
+    # Prefix lookups for partially typed order numbers and mobiles
+    db.orders.create_index([("order_number", ASCENDING)])
+    db.orders.create_index([("customer_mobile", ASCENDING)])
+
+    # One customer per mobile number; backs add_customer and bulk import
+    ensure_unique_mobile(db)
+
+    # Per-customer history (order list, payment list, customer overview)
+    db.orders.create_index([("customer_id", ASCENDING), ("created_at", DESCENDING)])
+    db.payments.create_index([("customer_id", ASCENDING), ("created_at", DESCENDING)])
+
+    # Dues aging: candidate customers with a past due date
+    db.payments.create_index([("due_date", ASCENDING)])
+
+    # Payments settled against a specific order
+    db.payments.create_index([("order_id", ASCENDING)], sparse=True)
+
+    # Expense reports: date range first, then the pivot/filter dimensions
+    db.expenses.create_index([("created_at", ASCENDING), ("expense_type", ASCENDING), ("category", ASCENDING)])
+
+    # Partner equity ledger
+    db.owner_transactions.create_index([("owner_id", ASCENDING), ("at", ASCENDING)])
+
+    # Employee advance / salary ledger, read per employee per month
+    db.employee_payments.create_index([("employee_id", ASCENDING), ("month", ASCENDING)])
+    # At most one salary payout per employee per month (settle_payroll)
+    try:
+        db.employee_payments.create_index(
+            [("employee_id", ASCENDING), ("month", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"kind": "salary"},
+            name="employee_payments_salary_once",
+        )
+    except OperationFailure as exc:
+        logger.error("Could not build the one-salary-per-month index: %s", exc)
+
+    # Karigar workload: open orders per assigned employee and stage
+    db.orders.create_index([("is_active", ASCENDING), ("status", ASCENDING), ("assigned_employee_id", ASCENDING)])
+    # Production board: per-status columns ordered by delivery date
+    db.orders.create_index([("is_active", ASCENDING), ("status", ASCENDING), ("delivery_date", ASCENDING)])
+    # Daily stats job scans only recently changed orders
+    db.orders.create_index([("status_history.changed_at", ASCENDING)])
+
+    # Sign-in failure counters expire on their own
+    db.login_attempts.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    # Diagnostics logs are capped, so they never need cleaning up
+    existing = db.list_collection_names()
+    for name, size in (
+        (SLOW_QUERY_COLLECTION, settings.SLOW_QUERY_LOG_BYTES),
+        (PROFILE_COLLECTION, settings.PROFILE_LOG_BYTES),
+    ):
+        if name in existing:
+            continue
+        try:
+            db.create_collection(name, capped=True, size=size)
+        except CollectionInvalid:
+            pass  # another worker created it first
@@ -0,0 +1,65 @@
+import math
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+# Failed sign-ins per username and per client IP, one small counter
+# document each. A TTL index on expires_at drops them once the window
+# has passed (see indexes.py), so the collection stays tiny.
+ATTEMPTS_COLLECTION = "login_attempts"
+
+
+def user_key(username: str) -> str:
+    return f"user:{username.strip().lower()}"
+
+
+def ip_key(ip: str | None) -> str:
+    return f"ip:{ip or 'unknown'}"
+
+
+def check_login_allowed(db, username: str | None, ip: str | None):
+    """Raise 429 when the username or IP has used up its failures."""
+    limits = {ip_key(ip): settings.LOGIN_MAX_FAILURES_PER_IP}
+    if username is not None:
+        limits[user_key(username)] = settings.LOGIN_MAX_FAILURES_PER_USER
+
+    now = datetime.utcnow()
+    counters = db[ATTEMPTS_COLLECTION].find({
+        "_id": {"$in": list(limits)},
+        # the TTL monitor only runs every minute
+        "expires_at": {"$gt": now}
+    })
+
+    for counter in counters:
+        if counter["count"] >= limits[counter["_id"]]:
+            retry_after = math.ceil((counter["expires_at"] - now).total_seconds())
+            raise HTTPException(
+                status_code=429,
+                detail="Too many failed sign-in attempts, try again later",
+                headers={"Retry-After": str(max(retry_after, 1))}
+            )
+
+
+def record_login_failure(db, username: str, ip: str | None):
+    now = datetime.utcnow()
+    # A counter whose window ran out (but the TTL monitor hasn't removed
+    # yet) starts over instead of carrying its old count forward
+    live = {"$gt": ["$expires_at", now]}
+    update = [{
+        "$set": {
+            "count": {"$cond": [live, {"$add": ["$count", 1]}, 1]},
+            "expires_at": {
+                "$cond": [live, "$expires_at", now + timedelta(seconds=settings.LOGIN_ATTEMPT_WINDOW)]
+            },
+        }
+    }]
+    for key in (user_key(username), ip_key(ip)):
+        db[ATTEMPTS_COLLECTION].update_one({"_id": key}, update, upsert=True)
+
+
+def clear_login_failures(db, username: str):
+    # Only the username is forgiven; the IP keeps its count so one valid
+    # account can't be used to reset a guessing run against others
+    db[ATTEMPTS_COLLECTION].delete_one({"_id": user_key(username)})
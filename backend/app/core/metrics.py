@@ -0,0 +1,201 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+from app.core.request_context import route_template
+
+# With several workers, set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py)
+# and /metrics merges every worker's values; gauges are summed over the
+# workers that are still alive.
+
+HTTP_REQUESTS = Counter(
+    "silaibook_http_requests_total",
+    "HTTP requests handled",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "silaibook_http_request_duration_seconds",
+    "Time spent handling a request",
+    ["method", "route"],
+)
+HTTP_IN_PROGRESS = Gauge(
+    "silaibook_http_requests_in_progress",
+    "Requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "silaibook_http_response_size_bytes",
+    "Response body size",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+ADMISSION_REJECTED = Counter(
+    "silaibook_admission_rejected_total",
+    "Requests shed by admission control",
+    ["route_class", "reason"],
+)
+ADMISSION_WAITING = Gauge(
+    "silaibook_admission_waiting",
+    "Requests queued for a slot in their route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    "silaibook_mongo_command_duration_seconds",
+    "MongoDB command round trip time",
+    ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "silaibook_mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["command", "collection"],
+)
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    "silaibook_mongo_pool_connections",
+    "Open connections in the pymongo pool",
+    ["address"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "silaibook_mongo_pool_checked_out",
+    "Connections currently in use by a request",
+    ["address"],
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_MAX_SIZE = Gauge(
+    "silaibook_mongo_pool_max_size",
+    "maxPoolSize the client was configured with (summed over workers)",
+    multiprocess_mode="livesum",
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "silaibook_mongo_pool_checkout_failures_total",
+    "Connection checkouts that failed (timeouts, pool closed, ...)",
+    ["address", "reason"],
+)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware; cheaper than BaseHTTPMiddleware per request.
+
+    The route template is read from the scope after the router has
+    matched it, so it is only known once the request is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+
+            route = route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size)
+
+
+def command_collection(event) -> str:
+    """Collection a command runs against ("" for admin commands)."""
+    if event.command_name == "getMore":
+        return event.command.get("collection", "")
+    target = event.command.get(event.command_name)
+    return target if isinstance(target, str) else ""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        # started/succeeded pairs are matched on (connection, request id)
+        self._collections = {}
+
+    def started(self, event):
+        key = (event.connection_id, event.request_id)
+        self._collections[key] = command_collection(event)
+
+    def _finish(self, event):
+        key = (event.connection_id, event.request_id)
+        collection = self._collections.pop(key, "")
+        return event.command_name, collection
+
+    def succeeded(self, event):
+        command, collection = self._finish(event)
+        MONGO_COMMAND_LATENCY.labels(command, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        command, collection = self._finish(event)
+        MONGO_COMMAND_LATENCY.labels(command, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(command, collection).inc()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = self._address(event)
+        MONGO_POOL_CONNECTIONS.labels(address).set(0)
+        MONGO_POOL_CHECKED_OUT.labels(address).set(0)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(self._address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).dec()
+
+
+def mongo_listeners() -> list:
+    """Listeners to pass to MongoClient(event_listeners=...)."""
+    return [CommandMetrics(), PoolMetrics()]
@@ -0,0 +1,251 @@
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from bson import ObjectId
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.core.auth_dependencies import is_admin, user_from_token
+from app.core.config import settings
+from app.core.request_context import route_template
+
+PROFILE_COLLECTION = "request_profiles"
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "_profile"
+
+# Frames from these packages mark a thread as busy with a request; an idle
+# event loop or threadpool worker has none of them on its stack.
+REQUEST_PACKAGES = (
+    os.sep + "app" + os.sep,
+    os.sep + "fastapi" + os.sep,
+    os.sep + "starlette" + os.sep,
+)
+THREADPOOL_PREFIX = "AnyIO worker thread"
+
+
+# -------------------------------
+# SAMPLING PROFILER
+# -------------------------------
+def frame_label(code) -> str:
+    path = code.co_filename
+    for marker in ("site-packages" + os.sep, os.sep + "backend" + os.sep):
+        if marker in path:
+            path = path.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Samples the event loop and threadpool stacks every few milliseconds.
+
+    Sync routes run on an AnyIO worker thread and async code on the loop,
+    so both are sampled; threads with no request frames on their stack
+    are skipped as idle. Requests running concurrently on other workers
+    show up too, so profile on a quiet instance where possible.
+
+    Stacks are kept in collapsed ("folded") form: root;...;leaf count,
+    which flamegraph.pl, speedscope and inferno all read directly.
+    """
+
+    def __init__(self, loop_thread_id: int):
+        super().__init__(name="request-profiler", daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.interval = settings.PROFILE_INTERVAL_MS / 1000
+        self.deadline = time.monotonic() + settings.PROFILE_MAX_SECONDS
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def _targets(self) -> set:
+        targets = {self.loop_thread_id}
+        for thread in threading.enumerate():
+            if thread.name.startswith(THREADPOOL_PREFIX):
+                targets.add(thread.ident)
+        return targets
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if time.monotonic() > self.deadline:
+                break
+            targets = self._targets()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in targets:
+                    continue
+                stack = []
+                busy = False
+                while frame is not None:
+                    code = frame.f_code
+                    busy = busy or any(p in code.co_filename for p in REQUEST_PACKAGES)
+                    stack.append(frame_label(code))
+                    frame = frame.f_back
+                if busy:
+                    self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def profiling_requested(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER and value.strip() in (b"1", b"true"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get(PROFILE_QUERY_PARAM, [""])[0] in ("1", "true")
+
+
+def admin_from_scope(scope) -> dict | None:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode().partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                user = user_from_token(token)
+            except HTTPException:
+                return None
+            return user if is_admin(user) else None
+    return None
+
+
+def save_profile(doc: dict):
+    from app.core.database import get_db
+    get_db()[PROFILE_COLLECTION].insert_one(doc)
+
+
+class ProfilingMiddleware:
+    """Profiles a single request when an admin asks for it.
+
+    Send `X-Profile: 1` (or `?_profile=1`) with the token of a user in
+    ADMIN_USERNAMES; the response carries `X-Profile-Id` and the folded
+    stacks can be fetched from /admin/profiles/{id}. Everyone else's requests pass straight
+    through without any sampling.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.ADMIN_USERNAMES
+            or not profiling_requested(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        user = await run_in_threadpool(admin_from_scope, scope)
+        if user is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = ObjectId()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile_id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident())
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+
+            await run_in_threadpool(save_profile, {
+                "_id": profile_id,
+                "at": datetime.utcnow(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_template(scope),
+                "requested_by": user["username"],
+                "pid": os.getpid(),
+                "duration_ms": round(duration_ms, 2),
+                "interval_ms": settings.PROFILE_INTERVAL_MS,
+                "samples": sampler.samples,
+                "folded": sampler.folded(),
+            })
+
+
+# -------------------------------
+# HEAP SNAPSHOTS
+# -------------------------------
+# Snapshots live in the worker that took them; with several workers the
+# same worker has to be hit again for a diff (see "pid" in responses).
+HEAP_SNAPSHOTS_KEPT = 5
+_heap_snapshots = {}
+_heap_lock = threading.Lock()
+
+HEAP_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def heap_stat(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+        "size_diff_kb": round(getattr(stat, "size_diff", 0) / 1024, 1),
+        "count_diff": getattr(stat, "count_diff", 0),
+    }
+
+
+def start_heap_tracing(frames: int):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_heap_tracing():
+    with _heap_lock:
+        _heap_snapshots.clear()
+    tracemalloc.stop()
+
+
+def take_heap_snapshot() -> tuple[str, tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="Heap tracing is not started")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(HEAP_IGNORED)
+    snapshot_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+
+    with _heap_lock:
+        _heap_snapshots[snapshot_id] = snapshot
+        while len(_heap_snapshots) > HEAP_SNAPSHOTS_KEPT:
+            _heap_snapshots.pop(next(iter(_heap_snapshots)))
+
+    return snapshot_id, snapshot
+
+
+def get_heap_snapshot(snapshot_id: str) -> tracemalloc.Snapshot:
+    with _heap_lock:
+        snapshot = _heap_snapshots.get(snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found in this worker")
+    return snapshot
+
+
+def heap_snapshot_ids() -> list:
+    with _heap_lock:
+        return list(_heap_snapshots)
@@ -0,0 +1,122 @@
+import logging
+import re
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.request_context import route_template
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    docs: int = 0
+    micros: int = 0
+
+    @property
+    def millis(self) -> float:
+        return self.micros / 1000
+
+
+# Set per request by QueryBudgetMiddleware. Sync routes run in the
+# threadpool with a copy of the context, which still points at the same
+# QueryStats object, so their commands land on the right request.
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def reply_docs(reply) -> int:
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if not cursor:
+        return 0
+    return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+
+
+class QueryBudgetListener(monitoring.CommandListener):
+    """Attributes every command to the request that issued it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.docs += reply_docs(event.reply)
+        stats.micros += event.duration_micros
+
+    def failed(self, event):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.micros += event.duration_micros
+
+
+def route_budget(method: str, route: str) -> int:
+    return settings.QUERY_BUDGETS.get(f"{method} {route}", settings.QUERY_BUDGET)
+
+
+def server_timing(stats: QueryStats) -> str:
+    return f'db;dur={stats.millis:.2f};desc="queries={stats.queries} docs={stats.docs}"'
+
+
+class QueryBudgetMiddleware:
+    """Adds a Server-Timing header and logs routes over their query budget."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+
+        route = route_template(scope)
+        budget = route_budget(scope["method"], route)
+        if stats.queries > budget:
+            logger.warning(
+                "Query budget exceeded: %s %s ran %d queries (budget %d), %d docs, %.1f ms",
+                scope["method"], route, stats.queries, budget, stats.docs, stats.millis
+            )
+
+
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="queries=(\d+) docs=(\d+)"')
+
+
+def assert_max_queries(response, max_queries: int):
+    """Test helper: fail if a response's request ran more than `max_queries`.
+
+    Reads the Server-Timing header, so it works with TestClient or any
+    HTTP client against a server running with QUERY_PROFILER_ENABLED:
+
+        assert_max_queries(client.post("/orders/", json=payload), 6)
+    """
+    match = SERVER_TIMING_DB.search(response.headers.get("server-timing", ""))
+    assert match, "No db Server-Timing header; is QUERY_PROFILER_ENABLED on?"
+
+    queries = int(match.group(2))
+    assert queries <= max_queries, (
+        f"{response.request.method} {response.request.url.path} ran {queries} "
+        f"queries, expected at most {max_queries}"
+    )
+    return queries
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from contextvars import ContextVar
+
+import pymongo
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pymongo import monitoring
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.admission import route_class
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INTERRUPTED = 11601  # server error code for a killed operation
+
+
+class RequestOps:
+    """Mongo commands a request currently has running on the server."""
+
+    def __init__(self):
+        # (connection, request id) -> server-side connection id
+        self.inflight = {}
+        self.cancelled = False
+
+
+_current_ops: ContextVar[RequestOps | None] = ContextVar("request_ops", default=None)
+
+
+class InflightCommandListener(monitoring.CommandListener):
+    """Remembers the server connection of every running command, per request."""
+
+    def started(self, event):
+        ops = _current_ops.get()
+        if ops is not None and event.server_connection_id is not None:
+            ops.inflight[(event.connection_id, event.request_id)] = event.server_connection_id
+
+    def succeeded(self, event):
+        ops = _current_ops.get()
+        if ops is not None:
+            ops.inflight.pop((event.connection_id, event.request_id), None)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+def kill_inflight(ops: RequestOps):
+    """killOp the request's running commands, and nothing else.
+
+    A pymongo connection runs one command at a time and isn't checked
+    back in before the command's succeeded/failed event, so an op found
+    on that server connection while the command is still in flight here
+    is this request's. Ops whose command finished in the meantime are
+    left alone; opids are never reused, so a late killOp is a no-op.
+    (Sessions are not used for this: an implicit session goes back to
+    the pool and on to another request as soon as a command finishes.)
+    """
+    from app.core.database import get_client
+
+    snapshot = dict(ops.inflight)
+    if not snapshot:
+        return
+    admin = get_client().admin
+    try:
+        running = list(admin.aggregate([
+            {"$currentOp": {"allUsers": True, "localOps": True}},
+            {"$match": {"connectionId": {"$in": list(set(snapshot.values()))}}},
+            {"$project": {"opid": 1, "connectionId": 1}},
+        ]))
+        mine = [
+            op["opid"] for op in running
+            if any(
+                key in ops.inflight and conn_id == op["connectionId"]
+                for key, conn_id in snapshot.items()
+            )
+        ]
+        for opid in mine:
+            admin.command("killOp", op=opid)
+    except PyMongoError as exc:
+        logger.warning("Could not kill queries of a disconnected request: %s", exc)
+
+
+def request_timeout(path: str) -> float | None:
+    if path in settings.MONGO_TIMEOUT_OVERRIDES:
+        return settings.MONGO_TIMEOUT_OVERRIDES[path]
+    name = route_class(path)
+    return settings.MONGO_TIMEOUTS.get(name) if name else None
+
+
+def has_body(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"transfer-encoding":
+            return True
+        if name == b"content-length":
+            return value.strip() != b"0"
+    return False
+
+
+class QueryTimeoutMiddleware:
+    """Per-request Mongo time budget, and cancellation on disconnect.
+
+    pymongo.timeout() gives every operation in the request (including the
+    ones run from the threadpool, which inherits the context) a shared
+    deadline; pymongo turns what's left of it into maxTimeMS. If the client
+    goes away first, the request's running commands are killed on the
+    server (see kill_inflight). The Python side of a sync route can't
+    be interrupted, but it stops waiting on the database.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = request_timeout(scope["path"])
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        ops = RequestOps()
+        body_read = asyncio.Event()
+        # Without a body the watcher is the only reader of `receive` and
+        # relays what it gets (the empty body, then the disconnect) to the app
+        relayed = None if has_body(scope) else asyncio.Queue()
+
+        async def receive_wrapper():
+            if relayed is not None:
+                return await relayed.get()
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body"):
+                body_read.set()
+            return message
+
+        async def watch_disconnect():
+            if relayed is None:
+                # Only listen once the app is done with the body, so the
+                # two never compete for the same message
+                await body_read.wait()
+            while True:
+                message = await receive()
+                if relayed is not None:
+                    relayed.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    ops.cancelled = True
+                    await run_in_threadpool(kill_inflight, ops)
+                    return
+
+        token = _current_ops.set(ops)
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            with pymongo.timeout(timeout):
+                await self.app(scope, receive_wrapper, send)
+        finally:
+            watcher.cancel()
+            _current_ops.reset(token)
+
+
+async def mongo_error_handler(request: Request, exc: PyMongoError):
+    """504 for a blown time budget, 499 for queries killed on disconnect."""
+    if exc.timeout:
+        return JSONResponse(
+            {"detail": "The database took too long to answer, try a narrower query"},
+            status_code=504
+        )
+    if isinstance(exc, OperationFailure) and exc.code == INTERRUPTED:
+        return JSONResponse({"detail": "Client closed request"}, status_code=499)
+    raise exc
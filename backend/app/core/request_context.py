@@ -0,0 +1,38 @@
+from contextvars import ContextVar
+
+# Labels are route templates ("/orders/{order_id}"), never raw paths, so
+# anything keyed by route stays bounded no matter how many ids get requested.
+UNMATCHED_ROUTE = "<unmatched>"
+
+_current_scope: ContextVar[dict | None] = ContextVar("request_scope", default=None)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def current_route() -> str | None:
+    """Route of the request being handled, if any (e.g. from a Mongo listener).
+
+    The router fills in scope["route"] once it has matched, which is
+    always before the endpoint (and its queries) run.
+    """
+    scope = _current_scope.get()
+    return route_template(scope) if scope is not None else None
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
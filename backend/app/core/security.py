@@ -1,12 +1,27 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+
+from fastapi import HTTPException
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.tracing import tracer
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min == max == rounds: any hash at a different cost is flagged by
+# verify_and_update, so changing BCRYPT_ROUNDS rehashes users on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -17,6 +32,65 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """(valid, new hash if the stored one uses an outdated cost)."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+# -------------------------------
+# HASHING POOL
+# -------------------------------
+# bcrypt runs in its own processes so a burst of logins can't occupy the
+# request threadpool. Work beyond BCRYPT_MAX_PENDING is turned away with
+# a 503 instead of piling up behind the pool.
+_pool: ProcessPoolExecutor | None = None
+_pending = threading.BoundedSemaphore(settings.BCRYPT_MAX_PENDING)
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: a child forked from this multithreaded
+        # worker could inherit a lock some other thread was holding
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.BCRYPT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_hash_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_hash_pool(span_name: str, fn, *args):
+    if not _pending.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins in progress, try again in a moment",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        with tracer.start_as_current_span(span_name):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(get_hash_pool(), fn, *args)
+    finally:
+        _pending.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_in_hash_pool("auth.bcrypt_hash", hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> tuple[bool, str | None]:
+    return await run_in_hash_pool(
+        "auth.bcrypt_verify", verify_and_update_password, plain, hashed
+    )
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
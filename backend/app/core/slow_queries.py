@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import queue
+import random
+import threading
+from datetime import datetime
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.request_context import current_route
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_COLLECTION = "slow_queries"
+
+# Commands MongoDB can explain, and the part of each that describes its shape
+EXPLAINABLE = {
+    "find": ("filter", "sort"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+
+# Session / cluster bookkeeping that explain won't accept
+NOT_EXPLAINABLE_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern"}
+
+
+# -------------------------------
+# SHAPES
+# -------------------------------
+def redact(value):
+    """Keep keys, operators and $field references; hide every literal."""
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        shapes = []
+        for item in value:
+            shape = redact(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> dict:
+    shape = {}
+    for field in EXPLAINABLE.get(command_name, ()):
+        if field not in command:
+            continue
+        value = command[field]
+        if field == "updates" or field == "deletes":
+            # only the filters matter; update bodies can be large
+            value = [stmt.get("q", {}) for stmt in value]
+        if field in ("sort", "key"):
+            shape[field] = value
+        else:
+            shape[field] = redact(value)
+    return shape
+
+
+def shape_key(collection: str, command_name: str, shape: dict) -> str:
+    payload = json.dumps([collection, command_name, shape], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+# -------------------------------
+# EXPLAIN
+# -------------------------------
+def find_stages(plan) -> list:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                stages.extend(find_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(find_stages(item))
+    return stages
+
+
+def find_execution_stats(explain):
+    """executionStats is top level for find, nested under $cursor for aggregate."""
+    if isinstance(explain, dict):
+        if "executionStats" in explain:
+            return explain["executionStats"]
+        for value in explain.values():
+            found = find_execution_stats(value)
+            if found:
+                return found
+    elif isinstance(explain, list):
+        for item in explain:
+            found = find_execution_stats(item)
+            if found:
+                return found
+    return None
+
+
+def summarize_explain(explain: dict) -> dict:
+    stats = find_execution_stats(explain) or {}
+    stages = find_stages(explain)
+
+    docs_examined = stats.get("totalDocsExamined", 0)
+    returned = stats.get("nReturned", 0)
+
+    flags = []
+    if "COLLSCAN" in stages:
+        flags.append("COLLSCAN")
+    if docs_examined > settings.SLOW_QUERY_EXAMINED_RATIO * max(returned, 1):
+        flags.append("HIGH_EXAMINED_RATIO")
+
+    return {
+        "stages": sorted(set(stages)),
+        "docs_examined": docs_examined,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "returned": returned,
+        "execution_ms": stats.get("executionTimeMillis"),
+        "flags": flags,
+    }
+
+
+def explain_command(database_name: str, command_name: str, command: dict) -> dict | None:
+    from app.core.database import get_client
+
+    if command_name == "aggregate" and any(
+        "$out" in stage or "$merge" in stage for stage in command.get("pipeline", [])
+    ):
+        return None  # executionStats explain isn't allowed for writing pipelines
+
+    body = {
+        k: v for k, v in command.items()
+        if not k.startswith("$") and k not in NOT_EXPLAINABLE_FIELDS
+    }
+    try:
+        explain = get_client()[database_name].command(
+            {"explain": body, "verbosity": "executionStats"}
+        )
+    except PyMongoError as exc:
+        logger.info("Could not explain slow %s: %s", command_name, exc)
+        return None
+    return summarize_explain(explain)
+
+
+# -------------------------------
+# WORKER
+# -------------------------------
+# Explains and inserts happen on one background thread, never on the
+# request's thread, and the worker's own commands are never logged.
+_queue: queue.Queue = queue.Queue(maxsize=1000)
+_worker_lock = threading.Lock()
+_worker: threading.Thread | None = None
+_worker_local = threading.local()
+
+
+def _record(entry: dict):
+    from app.core.database import get_db
+
+    command = entry.pop("_command", None)
+    if command is not None:
+        entry["plan"] = explain_command(entry["database"], entry["command"], command)
+
+    entry["explained"] = entry["plan"] is not None
+    entry["flags"] = entry["plan"]["flags"] if entry["plan"] else []
+    get_db()[SLOW_QUERY_COLLECTION].insert_one(entry)
+
+
+def _run_worker():
+    _worker_local.active = True
+    while True:
+        entry = _queue.get()
+        try:
+            _record(entry)
+        except Exception:
+            logger.exception("Failed to record slow query")
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="slow-query-log", daemon=True)
+            _worker.start()
+
+
+# -------------------------------
+# LISTENER
+# -------------------------------
+class SlowQueryListener(monitoring.CommandListener):
+    def __init__(self):
+        # (connection, request id) -> (collection, command) until completion
+        self._pending = {}
+
+    def started(self, event):
+        if getattr(_worker_local, "active", False):
+            return
+        name = event.command_name
+        target = event.command.get("collection") if name == "getMore" else event.command.get(name)
+        if not isinstance(target, str) or target == SLOW_QUERY_COLLECTION:
+            return
+        command = event.command if name in EXPLAINABLE else None
+        self._pending[(event.connection_id, event.request_id)] = (target, command)
+
+    def _finish(self, event, failed: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < settings.SLOW_QUERY_MS:
+            return
+
+        collection, command = pending
+        shape = command_shape(event.command_name, command) if command else {}
+        entry = {
+            "at": datetime.utcnow(),
+            "route": current_route(),
+            "database": event.database_name,
+            "collection": collection,
+            "command": event.command_name,
+            "duration_ms": round(duration_ms, 2),
+            "failed": failed,
+            "shape": shape,
+            "shape_key": shape_key(collection, event.command_name, shape),
+            "plan": None,
+        }
+        if command is not None and not failed and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE:
+            entry["_command"] = command
+
+        _ensure_worker()
+        try:
+            _queue.put_nowait(entry)
+        except queue.Full:
+            pass  # never slow a request down to log that it was slow
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
@@ -0,0 +1,132 @@
+import threading
+
+from fastapi.responses import JSONResponse
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, StatusCode
+from pymongo import monitoring
+
+from app.core.config import settings
+
+# Request, dependency (get_current_user), endpoint and serialization spans
+# come from FastAPI's own telemetry; this module adds the provider setup
+# plus spans for Mongo commands, bcrypt and response encoding. Without a
+# configured provider every span here is a no-op.
+tracer = trace.get_tracer("silaibook")
+
+
+class FileSpanExporter:
+    """Writes one OTLP-style JSON span per line; stand-in for a collector."""
+
+    def __init__(self, path: str):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        self._result = SpanExportResult
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock, open(self._path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return self._result.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000):
+        return True
+
+
+def setup_tracing():
+    """Install the SDK tracer provider described by the TRACING_* settings.
+
+    Called from the app's lifespan, so every worker gets its own export
+    thread after the fork.
+    """
+    if not settings.TRACING_ENABLED:
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        raise RuntimeError("TRACING_ENABLED requires opentelemetry-sdk (pip install opentelemetry-sdk)")
+
+    if settings.TRACING_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            raise RuntimeError(
+                "TRACING_EXPORTER=otlp requires opentelemetry-exporter-otlp-proto-http"
+            )
+        exporter = OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    else:
+        exporter = FileSpanExporter(settings.TRACING_FILE)
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+        # Follow an upstream sampling decision (traceparent) when there is one
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def shutdown_tracing():
+    """Flush spans still waiting in the batch processor."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+class TracedJSONResponse(JSONResponse):
+    """JSONResponse whose encoding step shows up as its own span."""
+
+    def render(self, content) -> bytes:
+        with tracer.start_as_current_span("response.encode") as span:
+            body = super().render(content)
+            span.set_attribute("http.response.body.size", len(body))
+            return body
+
+
+class MongoTracingListener(monitoring.CommandListener):
+    """One client span per Mongo command, parented to the request's span."""
+
+    def __init__(self):
+        self._spans = {}
+
+    def started(self, event):
+        if not trace.get_current_span().is_recording():
+            return  # unsampled request, or a command outside any request
+        name = event.command_name
+        collection = event.command.get("collection") if name == "getMore" else event.command.get(name)
+        attributes = {
+            "db.system.name": "mongodb",
+            "db.namespace": event.database_name,
+            "db.operation.name": name,
+            "server.address": event.connection_id[0],
+            "server.port": event.connection_id[1],
+        }
+        if isinstance(collection, str):
+            attributes["db.collection.name"] = collection
+        span = tracer.start_span(
+            f"{name} {collection}" if isinstance(collection, str) else name,
+            kind=SpanKind.CLIENT,
+            attributes=attributes,
+        )
+        self._spans[(event.connection_id, event.request_id)] = span
+
+    def succeeded(self, event):
+        span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.end()
+
+    def failed(self, event):
+        span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            failure = event.failure if isinstance(event.failure, dict) else {}
+            span.set_attribute("error.type", str(failure.get("codeName", "MongoError")))
+            span.set_status(StatusCode.ERROR, str(failure.get("errmsg", ""))[:200])
+            span.end()
@@ -1,41 +1,168 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.routers import health,auth,protected,customers,cloth_stock,payments,dashboard,expenses,employees,orders,owners
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import os
 
-app = FastAPI(
-    title="SilaiBook API",
-    description="Tailoring Shop Management System",
-    version="1.0.0"
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",  # React dev server
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(health.router)
-app.include_router(auth.router)
-app.include_router(protected.router)
-app.include_router(customers.router)
-app.include_router(cloth_stock.router)
-app.include_router(payments.router)
-app.include_router(dashboard.router)
-app.include_router(expenses.router)
-app.include_router(employees.router)
-app.include_router(owners.router)
-app.include_router(orders.router)
-
-# Ensure static directory exists
-os.makedirs("app/static/photos", exist_ok=True)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
-@app.get("/")
-def root():
-    return {"message": "SilaiBook backend is running"}
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Everything heavier than settings is imported inside create_app(), so
+# importing this module (scripts, test collection, the gunicorn master)
+# stays cheap and opens no connections. Run with either
+#   uvicorn app.main:create_app --factory
+#   uvicorn app.main:app
+# or several workers through gunicorn (see gunicorn.conf.py).
+
+
+def warm_up(app: FastAPI):
+    """Index and cache setup that used to block startup.
+
+    Runs in the background once the worker is accepting requests; /health
+    reports "warm" when it is done. Failures are logged, not fatal: the
+    indexes already exist on any database that has been up before.
+    """
+    started = time.perf_counter()
+    from pymongo.errors import PyMongoError
+    from app.core.indexes import ensure_indexes
+    from app.utils.photo_manifest import build_photo_manifest
+
+    # Local and quick, so legacy (non-hashed) photos are served again
+    # before the index builds, which can wait on Mongo
+    build_photo_manifest()
+    try:
+        ensure_indexes()
+    except PyMongoError:
+        logger.exception("Could not ensure indexes")
+
+    app.state.warm = True
+    app.state.warm_seconds = round(time.perf_counter() - started, 3)
+
+
+def stop_workers():
+    from app.core.database import close_client
+    from app.core.security import shutdown_hash_pool
+    from app.core.tracing import shutdown_tracing
+    from app.utils.photos import shutdown_photo_pool
+
+    shutdown_photo_pool()
+    shutdown_hash_pool()
+    close_client()
+    shutdown_tracing()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after the fork: the Mongo pool, the export
+    # thread and the process pools all belong to this process only
+    from app.core.database import get_client
+    from app.core.tracing import setup_tracing
+
+    setup_tracing()
+    os.makedirs(settings.PHOTO_DIR, exist_ok=True)
+    get_client()
+
+    app.state.warm = False
+    warmup = asyncio.create_task(run_in_threadpool(warm_up, app))
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        stop_workers()
+
+
+def create_app() -> FastAPI:
+    from app.routers import health,auth,protected,customers,cloth_stock,payments,dashboard,expenses,employees,orders,owners,search,photos,metrics,admin
+    from app.core.admission import AdmissionMiddleware
+    from app.core.metrics import MetricsMiddleware
+    from app.core.query_budget import QueryBudgetMiddleware
+    from app.core.request_context import RequestContextMiddleware
+    from app.core.profiling import ProfilingMiddleware
+    from app.core.query_timeouts import QueryTimeoutMiddleware, mongo_error_handler
+    from app.core.tracing import TracedJSONResponse
+    from pymongo.errors import PyMongoError
+
+    app = FastAPI(
+        title="SilaiBook API",
+        description="Tailoring Shop Management System",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=TracedJSONResponse,
+        telemetry={
+            "tracing": settings.TRACING_ENABLED,
+            "metrics": False,  # Prometheus /metrics covers these
+            "logs": False,
+            "exclude": lambda scope: scope.get("path") == "/metrics",
+        },
+    )
+    app.state.warm = False
+
+    # Time spent queued for admission doesn't count against the Mongo budget
+    if settings.MONGO_TIMEOUTS_ENABLED:
+        app.add_middleware(QueryTimeoutMiddleware)
+        app.add_exception_handler(PyMongoError, mongo_error_handler)
+
+    # Inside CORS, so shed requests still carry CORS headers to the browser
+    if settings.ADMISSION_ENABLED:
+        app.add_middleware(AdmissionMiddleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:5173",  # React dev server
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if settings.QUERY_PROFILER_ENABLED:
+        app.add_middleware(QueryBudgetMiddleware)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestContextMiddleware)
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+
+    app.include_router(health.router)
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics.router)
+    app.include_router(auth.router)
+    app.include_router(protected.router)
+    app.include_router(customers.router)
+    app.include_router(cloth_stock.router)
+    app.include_router(payments.router)
+    app.include_router(dashboard.router)
+    app.include_router(expenses.router)
+    app.include_router(employees.router)
+    app.include_router(owners.router)
+    app.include_router(orders.router)
+    app.include_router(search.router)
+    app.include_router(admin.router)
+
+    # Photos are served by their own route (ETag / immutable caching) ahead
+    # of the generic /static mount.
+    app.include_router(photos.router)
+
+    # The directory is created by the lifespan, not at import
+    app.mount("/static", StaticFiles(directory="app/static", check_dir=False), name="static")
+
+    @app.get("/")
+    def root():
+        return {"message": "SilaiBook backend is running"}
+
+    return app
+
+
+def __getattr__(name):
+    # `app.main:app` keeps working, built on first access
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -23,6 +23,7 @@ class OrderCreate(BaseModel):
     order_type: str
     price: float = 0
     advance_amount: float = 0  # Added for invoice
+    payment_mode: Optional[str] = "Cash"  # how the advance was paid
     measurements: Dict
     cloth_items: List[ClothItem]
     delivery_date: date
@@ -33,6 +34,13 @@ class OrderStatusUpdate(BaseModel):
     status: OrderStatus
 
 
+class OrderBulkStatusUpdate(BaseModel):
+    order_ids: List[str] = Field(min_length=1, max_length=200)
+    status: OrderStatus
+    employee_id: Optional[str] = None
+    confirm: bool = False  # required when moving orders to Ready
+
+
 class OrderOut(BaseModel):
     id: str = Field(alias="_id")
 
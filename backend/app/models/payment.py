@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime,date
-from typing import Optional
+from typing import List, Optional
 
 class PaymentCreate(BaseModel):
     customer_id: str
@@ -8,6 +8,11 @@ class PaymentCreate(BaseModel):
     paid_amount: float
     payment_mode: Optional[str] = "Cash"
     due_date: Optional[date] = None
+    order_id: Optional[str] = None  # settle against a specific order
+
+
+class PaymentBatch(BaseModel):
+    payments: List[PaymentCreate] = Field(..., min_length=1, max_length=500)
 
 
 class PaymentDB(PaymentCreate):
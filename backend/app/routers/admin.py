@@ -0,0 +1,180 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from bson import ObjectId
+from datetime import datetime, timedelta
+from typing import Optional
+import os
+import tracemalloc
+
+from app.core.database import get_db
+from app.core.auth_dependencies import get_admin_user
+from app.core.slow_queries import SLOW_QUERY_COLLECTION
+from app.core.profiling import (
+    PROFILE_COLLECTION,
+    heap_stat,
+    heap_snapshot_ids,
+    get_heap_snapshot,
+    start_heap_tracing,
+    stop_heap_tracing,
+    take_heap_snapshot,
+)
+from app.utils.bson import serialize_doc
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+
+# -------------------------------
+# SLOW QUERIES
+# -------------------------------
+@router.get("/slow-queries")
+def slow_queries(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    route: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(get_admin_user)
+):
+    """Worst query shapes per route, by total time spent in them."""
+    db = get_db()
+
+    match = {"at": {"$gte": datetime.utcnow() - timedelta(hours=hours)}}
+    if route:
+        match["route"] = route
+
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"at": 1}},
+        {
+            "$group": {
+                "_id": {"route": "$route", "shape_key": "$shape_key"},
+                "collection": {"$first": "$collection"},
+                "command": {"$first": "$command"},
+                "shape": {"$first": "$shape"},
+                "count": {"$sum": 1},
+                "total_ms": {"$sum": "$duration_ms"},
+                "max_ms": {"$max": "$duration_ms"},
+                "avg_ms": {"$avg": "$duration_ms"},
+                "last_seen": {"$last": "$at"},
+                "flags": {"$addToSet": "$flags"},
+                # the latest explained plan is picked below
+                "plans": {"$push": "$plan"},
+            }
+        },
+        {"$sort": {"total_ms": -1}},
+        {"$limit": limit},
+    ]
+
+    rows = list(db[SLOW_QUERY_COLLECTION].aggregate(pipeline))
+
+    return [
+        serialize_doc({
+            "route": r["_id"]["route"],
+            "collection": r["collection"],
+            "command": r["command"],
+            "shape": r["shape"],
+            "count": r["count"],
+            "total_ms": round(r["total_ms"], 2),
+            "avg_ms": round(r["avg_ms"], 2),
+            "max_ms": r["max_ms"],
+            "last_seen": r["last_seen"],
+            "flags": sorted({f for flags in r["flags"] for f in flags}),
+            "plan": next((p for p in reversed(r["plans"]) if p), None),
+        })
+        for r in rows
+    ]
+
+
+# -------------------------------
+# REQUEST PROFILES
+# -------------------------------
+@router.get("/profiles")
+def list_profiles(
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(get_admin_user)
+):
+    """Recent profiles taken with `X-Profile: 1` (stacks left out)."""
+    db = get_db()
+    profiles = db[PROFILE_COLLECTION].find({}, {"folded": 0}).sort("$natural", -1).limit(limit)
+    return [serialize_doc(p) for p in profiles]
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(
+    profile_id: str,
+    user: dict = Depends(get_admin_user)
+):
+    """Folded stacks, ready for flamegraph.pl / speedscope."""
+    if not ObjectId.is_valid(profile_id):
+        raise HTTPException(status_code=400, detail="Invalid profile id")
+
+    db = get_db()
+    profile = db[PROFILE_COLLECTION].find_one({"_id": ObjectId(profile_id)}, {"folded": 1})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return PlainTextResponse(profile["folded"])
+
+
+# -------------------------------
+# HEAP SNAPSHOTS (tracemalloc)
+# -------------------------------
+@router.post("/heap/start")
+def heap_start(
+    frames: int = Query(10, ge=1, le=50),
+    user: dict = Depends(get_admin_user)
+):
+    start_heap_tracing(frames)
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "pid": os.getpid()}
+
+
+@router.post("/heap/stop")
+def heap_stop(
+    user: dict = Depends(get_admin_user)
+):
+    stop_heap_tracing()
+    return {"tracing": False, "pid": os.getpid()}
+
+
+@router.post("/heap/snapshot")
+def heap_snapshot(
+    top: int = Query(20, ge=1, le=200),
+    user: dict = Depends(get_admin_user)
+):
+    snapshot_id, snapshot = take_heap_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+
+    return {
+        "snapshot_id": snapshot_id,
+        "pid": os.getpid(),
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "kept": heap_snapshot_ids(),
+        "top": [heap_stat(s) for s in snapshot.statistics("lineno")[:top]],
+    }
+
+
+@router.get("/heap/diff")
+def heap_diff(
+    base: str,
+    against: Optional[str] = None,
+    top: int = Query(20, ge=1, le=200),
+    user: dict = Depends(get_admin_user)
+):
+    """Allocation growth since `base` (against a fresh snapshot by default)."""
+    old = get_heap_snapshot(base)
+    if against:
+        new, new_id = get_heap_snapshot(against), against
+    else:
+        new_id, new = take_heap_snapshot()
+
+    stats = new.compare_to(old, "lineno")
+
+    return {
+        "base": base,
+        "against": new_id,
+        "pid": os.getpid(),
+        "growth_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+        "top": [heap_stat(s) for s in stats[:top]],
+    }
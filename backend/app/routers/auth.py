@@ -1,21 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from app.core.database import get_db
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_password_async, create_access_token
+from app.core.login_throttle import check_login_allowed, record_login_failure, clear_login_failures
 from app.models.user import UserCreate, UserLogin
 from datetime import datetime
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# Both routes are async: bcrypt runs in the hashing pool and the short
+# Mongo calls go through the threadpool, so neither holds a worker
+# thread while a hash is computed.
+
 @router.post("/register")
-def register(user: UserCreate):
+async def register(user: UserCreate, request: Request):
     db = get_db()
+    ip = request.client.host if request.client else None
+
+    await run_in_threadpool(check_login_allowed, db, None, ip)
 
-    if db.users.find_one({"username": user.username}):
+    if await run_in_threadpool(db.users.find_one, {"username": user.username}):
         raise HTTPException(status_code=400, detail="User already exists")
 
-    db.users.insert_one({
+    password_hash = await hash_password_async(user.password)
+
+    await run_in_threadpool(db.users.insert_one, {
         "username": user.username,
-        "password_hash": hash_password(user.password),
+        "password_hash": password_hash,
         "role": "owner",
         "created_at": datetime.utcnow(),
         "is_active": True
@@ -24,13 +35,33 @@ def register(user: UserCreate):
     return {"message": "User registered successfully"}
 
 @router.post("/login")
-def login(user: UserLogin):
+async def login(user: UserLogin, request: Request):
     db = get_db()
-    db_user = db.users.find_one({"username": user.username})
+    ip = request.client.host if request.client else None
+
+    await run_in_threadpool(check_login_allowed, db, user.username, ip)
 
-    if not db_user or not verify_password(user.password, db_user["password_hash"]):
+    db_user = await run_in_threadpool(db.users.find_one, {"username": user.username})
+
+    valid, new_hash = False, None
+    if db_user:
+        valid, new_hash = await verify_password_async(user.password, db_user["password_hash"])
+
+    if not valid:
+        await run_in_threadpool(record_login_failure, db, user.username, ip)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    def after_login():
+        clear_login_failures(db, user.username)
+        # BCRYPT_ROUNDS changed since this password was stored
+        if new_hash:
+            db.users.update_one(
+                {"_id": db_user["_id"]},
+                {"$set": {"password_hash": new_hash}}
+            )
+
+    await run_in_threadpool(after_login)
+
     token = create_access_token({
         "sub": db_user["username"],
         "role": db_user["role"]
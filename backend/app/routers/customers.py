@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from typing import List, Optional
 from datetime import datetime
-import shutil
-import os
-import uuid
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from app.core.database import get_db
 from app.core.auth_dependencies import get_current_user
 from app.models.customer import CustomerCreate
 from app.utils.bson import serialize_doc
+from app.utils.photos import PhotoUploadRoute, save_photo
+from app.utils.tabular import iter_upload_rows
 
 router = APIRouter(
     prefix="/customers",
@@ -22,8 +24,10 @@ def add_customer(
 ):
     db = get_db()
 
-    # Prevent duplicate mobile numbers
-    if db.customers.find_one({"mobile": customer.mobile}):
+    # Prevent duplicate mobile numbers. The unique index catches the
+    # race between this check and the insert, once it has been built
+    # (see ensure_unique_mobile).
+    if db.customers.find_one({"mobile": customer.mobile}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Customer already exists")
 
     doc = customer.dict()
@@ -32,7 +36,10 @@ def add_customer(
         "is_active": True
     })
 
-    result = db.customers.insert_one(doc)
+    try:
+        result = db.customers.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Customer already exists")
     doc["_id"] = str(result.inserted_id)
 
     return {
@@ -40,20 +47,149 @@ def add_customer(
         "customer": doc
     }
 
-@router.post("/upload-photo")
-def upload_photo(file: UploadFile = File(...)):
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+IMPORT_FIELDS = {"name", "mobile", "category", "photo_url"}
+
+
+def import_batch(db, batch: list, report: dict):
+    """Insert one validated batch; map duplicate-key failures back to rows."""
+    # Same check as add_customer, one query per batch: mobiles already
+    # stored or repeated within the batch are reported, not inserted
+    existing = {
+        c["mobile"] for c in db.customers.find(
+            {"mobile": {"$in": [doc["mobile"] for _, doc in batch]}}, {"mobile": 1}
+        )
+    }
+    fresh = []
+    for row_number, doc in batch:
+        if doc["mobile"] in existing:
+            report["duplicates"] += 1
+            add_import_error(report, row_number, "Mobile number already exists")
+        else:
+            existing.add(doc["mobile"])
+            fresh.append((row_number, doc))
+    batch = fresh
+    if not batch:
+        return
+
+    docs = [doc for _, doc in batch]
+    try:
+        result = db.customers.insert_many(docs, ordered=False)
+        report["inserted"] += len(result.inserted_ids)
+    except BulkWriteError as e:
+        details = e.details
+        report["inserted"] += details.get("nInserted", 0)
+        for err in details.get("writeErrors", []):
+            row_number = batch[err["index"]][0]
+            if err.get("code") == 11000:
+                report["duplicates"] += 1
+                add_import_error(report, row_number, "Mobile number already exists")
+            else:
+                report["failed"] += 1
+                add_import_error(report, row_number, err.get("errmsg", "Insert failed"))
+
+
+def add_import_error(report: dict, row_number: int, error: str):
+    if len(report["errors"]) < IMPORT_MAX_ERRORS:
+        report["errors"].append({"row": row_number, "error": error})
+    else:
+        report["errors_truncated"] = True
+
+
+@router.post("/import")
+def import_customers(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk import customers from CSV/XLSX.
+
+    Columns name, mobile, category and photo_url map to the customer; any
+    other column is treated as a measurement. Rows are validated and
+    inserted in batches, so memory stays flat regardless of file size.
+    """
+    db = get_db()
+
+    report = {
+        "inserted": 0,
+        "duplicates": 0,
+        "invalid": 0,
+        "failed": 0,
+        "errors": [],
+        "errors_truncated": False
+    }
+
+    now = datetime.utcnow()
+    batch = []
+
+    for row_number, row in iter_upload_rows(file):
+        measurements = {
+            k: v for k, v in row.items()
+            if k and k not in IMPORT_FIELDS and v
+        }
+        try:
+            customer = CustomerCreate(
+                name=row.get("name", ""),
+                mobile=row.get("mobile", ""),
+                category=row.get("category") or None,
+                photo_url=row.get("photo_url") or None,
+                measurements=measurements
+            )
+        except ValidationError as e:
+            report["invalid"] += 1
+            add_import_error(report, row_number, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            ))
+            continue
+
+        if not customer.name or not customer.mobile:
+            report["invalid"] += 1
+            add_import_error(report, row_number, "name and mobile are required")
+            continue
+
+        doc = customer.dict()
+        doc.update({
+            "created_at": now,
+            "is_active": True,
+            "imported_by": current_user["username"]
+        })
+        batch.append((row_number, doc))
+
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            import_batch(db, batch, report)
+            batch = []
+
+    if batch:
+        import_batch(db, batch, report)
+
+    return report
+
+async def upload_photo(
+    request: Request,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
     try:
-        # Create unique filename
-        ext = file.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{ext}"
-        filepath = f"app/static/photos/{filename}"
-        
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        return {"url": f"http://localhost:8000/static/photos/{filename}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        saved = await save_photo(file)
+    finally:
+        await file.close()
+
+    def photo_url(name: str) -> str:
+        return str(request.url_for("serve_photo", name=name))
+
+    return {
+        "url": photo_url(saved["original"]),
+        "thumbnail_url": photo_url(saved["variants"]["thumb"]),
+        "preview_url": photo_url(saved["variants"]["preview"]),
+        "hash": saved["hash"],
+        "size": saved["size"]
+    }
+
+# Registered by hand for the size-checking route class
+router.add_api_route(
+    "/upload-photo", upload_photo, methods=["POST"], route_class_override=PhotoUploadRoute
+)
 
 @router.get("/")
 def list_customers(
@@ -84,10 +220,18 @@ def update_customer(
 ):
     db = get_db()
 
-    result = db.customers.update_one(
-        {"_id": __import__("bson").ObjectId(customer_id), "is_active": True},
-        {"$set": customer.dict()}
-    )
+    if db.customers.find_one(
+        {"mobile": customer.mobile, "_id": {"$ne": ObjectId(customer_id)}}, {"_id": 1}
+    ):
+        raise HTTPException(status_code=400, detail="Another customer has this mobile number")
+
+    try:
+        result = db.customers.update_one(
+            {"_id": ObjectId(customer_id), "is_active": True},
+            {"$set": customer.dict()}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Another customer has this mobile number")
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -102,6 +246,118 @@ def customer_count():
         "count": count
     }
 
+@router.get("/{customer_id}/overview")
+def customer_overview(
+    customer_id: str,
+    orders_limit: int = Query(10, ge=1, le=50),
+    payments_limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_db()
+
+    # One round trip: profile + capped recent orders/payments + totals.
+    # The localField/foreignField $lookup form lets each sub-pipeline use
+    # the (customer_id, created_at) indexes.
+    pipeline = [
+        {"$match": {"_id": ObjectId(customer_id), "is_active": True}},
+        {
+            "$lookup": {
+                "from": "orders",
+                "localField": "_id",
+                "foreignField": "customer_id",
+                "pipeline": [
+                    {"$match": {"is_active": True}},
+                    {"$sort": {"created_at": -1}},
+                    {
+                        "$facet": {
+                            "recent": [
+                                {"$limit": orders_limit},
+                                {"$project": {"status_history": 0, "measurements_snapshot": 0}}
+                            ],
+                            "totals": [
+                                {
+                                    "$group": {
+                                        "_id": None,
+                                        "count": {"$sum": 1},
+                                        "order_value": {"$sum": "$price"}
+                                    }
+                                }
+                            ]
+                        }
+                    }
+                ],
+                "as": "orders"
+            }
+        },
+        {
+            "$lookup": {
+                "from": "payments",
+                "localField": "_id",
+                "foreignField": "customer_id",
+                "pipeline": [
+                    {"$sort": {"created_at": -1}},
+                    {
+                        "$facet": {
+                            "recent": [{"$limit": payments_limit}],
+                            "totals": [
+                                {
+                                    "$group": {
+                                        "_id": None,
+                                        "count": {"$sum": 1},
+                                        "total_bill": {"$sum": "$total_bill"},
+                                        "paid_amount": {"$sum": "$paid_amount"}
+                                    }
+                                }
+                            ]
+                        }
+                    }
+                ],
+                "as": "payments"
+            }
+        },
+        {
+            "$project": {
+                "profile": {
+                    "_id": "$_id",
+                    "name": "$name",
+                    "mobile": "$mobile",
+                    "category": "$category",
+                    "measurements": "$measurements",
+                    "photo_url": "$photo_url",
+                    "created_at": "$created_at"
+                },
+                "orders": {"$first": "$orders"},
+                "payments": {"$first": "$payments"}
+            }
+        }
+    ]
+
+    result = list(db.customers.aggregate(pipeline))
+    if not result:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    overview = result[0]
+    orders = overview["orders"]
+    payments = overview["payments"]
+
+    order_totals = orders["totals"][0] if orders["totals"] else {}
+    payment_totals = payments["totals"][0] if payments["totals"] else {}
+
+    total_bill = payment_totals.get("total_bill", 0)
+    paid_amount = payment_totals.get("paid_amount", 0)
+
+    return {
+        "customer": serialize_doc(overview["profile"]),
+        "recent_orders": [serialize_doc(o) for o in orders["recent"]],
+        "order_count": order_totals.get("count", 0),
+        "order_value": order_totals.get("order_value", 0),
+        "recent_payments": [serialize_doc(p) for p in payments["recent"]],
+        "payment_count": payment_totals.get("count", 0),
+        "total_bill": total_bill,
+        "paid_amount": paid_amount,
+        "outstanding_balance": max(total_bill - paid_amount, 0)
+    }
+
 @router.delete("/{customer_id}")
 def delete_customer(
     customer_id: str,
@@ -1,19 +1,14 @@
 from fastapi import APIRouter, Depends
-from datetime import datetime, timedelta,timezone
 
 from app.core.database import get_db
 from app.core.auth_dependencies import get_current_user
+from app.utils.dates import today_range, month_range
 
 router = APIRouter(
     prefix="/dashboard",
     tags=["Dashboard"]
 )
 
-def today_range():
-    start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
-    end = start + timedelta(days=1)
-    return start, end
-
 @router.get("/today-income")
 def today_income(current_user: dict = Depends(get_current_user)):
     db = get_db()
@@ -87,11 +82,6 @@ def customer_count(current_user: dict = Depends(get_current_user)):
     count = db.customers.count_documents({"is_active": True})
     return {"total_customers": count}
 
-def month_range(year: int, month: int):
-    start = datetime(year, month, 1)
-    end = datetime(year + (month // 12), ((month % 12) + 1), 1)
-    return start, end
-
 def total_income(db, start=None, end=None):
     match = {}
     if start and end:
@@ -131,12 +121,7 @@ def profit_loss(
 ):
     db = get_db()
 
-    start = datetime(year, month, 1, tzinfo=timezone.utc)
-    end = (
-        datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-        if month == 12
-        else datetime(year, month + 1, 1, tzinfo=timezone.utc)
-    )
+    start, end = month_range(year, month)
 
     income_pipeline = [
         {"$match": {"created_at": {"$gte": start, "$lt": end}}},
@@ -175,12 +160,7 @@ def yearly_trend(
     result = []
 
     for month in range(1, 13):
-        start = datetime(year, month, 1, tzinfo=timezone.utc)
-        end = (
-            datetime(year + 1, 1, 1, tzinfo=timezone.utc)
-            if month == 12
-            else datetime(year, month + 1, 1, tzinfo=timezone.utc)
-        )
+        start, end = month_range(year, month)
 
         # INCOME
         income_pipeline = [
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
+from typing import Optional
 from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+import calendar
 
-from app.core.database import get_db
+from app.core.database import get_db, run_transaction
 from app.core.auth_dependencies import get_current_user
 from app.models.employee import EmployeeCreate
 from app.utils.bson import serialize_doc
+from app.utils.dates import month_range
+from app.utils.karigar_stats import refresh_karigar_stats
 
 router = APIRouter(
     prefix="/employees",
@@ -65,25 +71,316 @@ def pay_employee(
 ):
     db = get_db()
 
-    employee = db.employees.find_one({
-        "_id": ObjectId(employee_id),
-        "is_active": True
-    })
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Invalid payment amount")
+
+    now = datetime.utcnow()
 
+    # The counter and its ledger entry commit together
+    def record(session):
+        # Atomic $inc; concurrent advances can no longer overwrite each other
+        employee = db.employees.find_one_and_update(
+            {"_id": ObjectId(employee_id), "is_active": True},
+            {"$inc": {"advance_paid": amount}},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if employee:
+            db.employee_payments.insert_one({
+                "employee_id": employee["_id"],
+                "employee_name": employee["name"],
+                "kind": "advance",
+                "amount": amount,
+                "month": now.strftime("%Y-%m"),
+                "at": now,
+                "created_by": current_user["username"]
+            }, session=session)
+        return employee
+
+    employee = run_transaction(record)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    new_advance = employee.get("advance_paid", 0) + amount
+    return {
+        "message": "Payment recorded",
+        "total_advance_paid": employee["advance_paid"]
+    }
+# -------------------------------
+# PAYROLL
+# -------------------------------
+def parse_month(month: str) -> datetime:
+    try:
+        return datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+
 
-    db.employees.update_one(
-        {"_id": ObjectId(employee_id)},
-        {"$set": {"advance_paid": new_advance}}
+def default_working_days(month_start: datetime) -> int:
+    """Days in the month minus Sundays."""
+    _, days = calendar.monthrange(month_start.year, month_start.month)
+    return sum(
+        1 for day in range(1, days + 1)
+        if calendar.weekday(month_start.year, month_start.month, day) != calendar.SUNDAY
     )
 
+
+def ledger_total(kind: str) -> dict:
     return {
-        "message": "Payment recorded",
-        "total_advance_paid": new_advance
+        "$sum": {
+            "$map": {
+                "input": {"$filter": {"input": "$paid", "cond": {"$eq": ["$$this._id", kind]}}},
+                "in": "$$this.total"
+            }
+        }
+    }
+
+
+def compute_payroll(db, month: str, working_days: int) -> list:
+    """Salary due, advances and net payable for every active employee.
+
+    One aggregation: each employee's ledger entries for the month are
+    pulled in with an indexed $lookup and summed by kind.
+    """
+    pipeline = [
+        {"$match": {"is_active": True}},
+        {
+            "$lookup": {
+                "from": "employee_payments",
+                "localField": "_id",
+                "foreignField": "employee_id",
+                "pipeline": [
+                    {"$match": {"month": month}},
+                    {"$group": {"_id": "$kind", "total": {"$sum": "$amount"}}}
+                ],
+                "as": "paid"
+            }
+        },
+        {
+            "$project": {
+                "name": 1,
+                "work_type": 1,
+                "salary_type": 1,
+                "salary_amount": 1,
+                "salary_due": {
+                    "$cond": [
+                        {"$eq": ["$salary_type", "Daily"]},
+                        {"$multiply": ["$salary_amount", working_days]},
+                        "$salary_amount"
+                    ]
+                },
+                "advances": ledger_total("advance"),
+                "salary_paid": ledger_total("salary"),
+                # a settlement can be 0 when advances covered the salary
+                "settled": {"$in": ["salary", "$paid._id"]}
+            }
+        },
+        {
+            "$addFields": {
+                "net_payable": {
+                    "$max": [
+                        {"$subtract": ["$salary_due", {"$add": ["$advances", "$salary_paid"]}]},
+                        0
+                    ]
+                }
+            }
+        },
+        {"$sort": {"name": 1}}
+    ]
+
+    return list(db.employees.aggregate(pipeline))
+
+
+@router.get("/payroll")
+def payroll(
+    month: str,
+    working_days: Optional[int] = Query(None, ge=0, le=31),
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_db()
+
+    month_start = parse_month(month)
+    if working_days is None:
+        working_days = default_working_days(month_start)
+
+    rows = compute_payroll(db, month, working_days)
+
+    return {
+        "month": month,
+        "working_days": working_days,
+        "total_salary_due": sum(r["salary_due"] for r in rows),
+        "total_advances": sum(r["advances"] for r in rows),
+        "total_net_payable": sum(r["net_payable"] for r in rows),
+        "employees": [serialize_doc(r) for r in rows]
     }
+
+
+@router.post("/payroll/settle")
+def settle_payroll(
+    month: str,
+    working_days: Optional[int] = Query(None, ge=0, le=31),
+    payment_mode: str = "Cash",
+    current_user: dict = Depends(get_current_user)
+):
+    """Pay out every employee's net payable for the month.
+
+    Writes the salary ledger entries, one salary expense per employee
+    (payout plus the advances it absorbed, i.e. the month's salary cost)
+    and the advance counter resets, in one transaction. Employees whose
+    advances cover the salary are settled too, with a payout of 0; any
+    advance beyond the salary is carried into next month's ledger, where
+    the next settlement deducts it. Each employee is settled at most
+    once per month: employees with a salary entry for the month are
+    skipped, and the unique (employee_id, month) index on salary entries
+    turns a concurrent second settle into a 409 instead of a double
+    payout.
+    """
+    db = get_db()
+
+    month_start = parse_month(month)
+    if working_days is None:
+        working_days = default_working_days(month_start)
+
+    rows = [r for r in compute_payroll(db, month, working_days) if not r["settled"]]
+    for r in rows:
+        r["advances_settled"] = min(r["advances"], r["salary_due"])
+        r["carried_over"] = r["advances"] - r["advances_settled"]
+    if not rows:
+        return {"message": "Nothing to settle", "month": month, "settled": 0, "total_paid": 0}
+
+    now = datetime.utcnow()
+    username = current_user["username"]
+    next_month = month_range(month_start.year, month_start.month)[1].strftime("%Y-%m")
+
+    def settle(session):
+        """Write the three collections; returns the rows actually settled."""
+        try:
+            db.employee_payments.bulk_write([
+                InsertOne({
+                    "employee_id": r["_id"],
+                    "employee_name": r["name"],
+                    "kind": "salary",
+                    "amount": r["net_payable"],
+                    "month": month,
+                    "at": now,
+                    "created_by": username
+                })
+                for r in rows
+            ], ordered=False, session=session)
+            settled = rows
+        except BulkWriteError as e:
+            if session is not None:
+                raise  # the transaction is aborted, nothing was written
+            # No transactions (standalone server): whoever got the salary
+            # entry in first settles that employee
+            taken = {err["index"] for err in e.details.get("writeErrors", [])}
+            settled = [r for i, r in enumerate(rows) if i not in taken]
+            if not settled:
+                return settled
+
+        expenses = [
+            InsertOne({
+                "amount": r["net_payable"] + r["advances_settled"],
+                "category": "Salary",
+                "expense_type": "EMPLOYEE",
+                "payment_mode": payment_mode,
+                "remarks": f"Salary {month} - {r['name']}",
+                "employee_id": r["_id"],
+                "created_at": now,
+                "created_by": username
+            })
+            for r in settled if r["net_payable"] + r["advances_settled"] > 0
+        ]
+        if expenses:
+            db.expenses.bulk_write(expenses, ordered=False, session=session)
+
+        # Advances beyond the salary stay owed, deducted next month
+        carried = [
+            InsertOne({
+                "employee_id": r["_id"],
+                "employee_name": r["name"],
+                "kind": "advance",
+                "amount": r["carried_over"],
+                "month": next_month,
+                "at": now,
+                "note": f"Carried over from {month}",
+                "created_by": username
+            })
+            for r in settled if r["carried_over"] > 0
+        ]
+        if carried:
+            db.employee_payments.bulk_write(carried, ordered=False, session=session)
+
+        # The advances absorbed by this salary are now settled; the carried
+        # part stays on the counter until next month's settlement
+        advance_resets = [
+            UpdateOne({"_id": r["_id"]}, {"$inc": {"advance_paid": -r["advances_settled"]}})
+            for r in settled if r["advances_settled"]
+        ]
+        if advance_resets:
+            db.employees.bulk_write(advance_resets, ordered=False, session=session)
+        return settled
+
+    try:
+        rows = run_transaction(settle)
+    except BulkWriteError:
+        raise HTTPException(
+            status_code=409,
+            detail="Payroll for this month is already being settled, reload and try again"
+        )
+    if not rows:
+        return {"message": "Nothing to settle", "month": month, "settled": 0, "total_paid": 0}
+
+    return {
+        "message": "Payroll settled",
+        "month": month,
+        "settled": len(rows),
+        "total_paid": sum(r["net_payable"] for r in rows),
+        "employees": [
+            {
+                "employee_id": str(r["_id"]),
+                "name": r["name"],
+                "paid": r["net_payable"],
+                "advance_carried_over": r["carried_over"]
+            }
+            for r in rows
+        ]
+    }
+
+# -------------------------------
+# KARIGAR THROUGHPUT
+# -------------------------------
+@router.get("/stats")
+def karigar_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    """Precomputed per-employee throughput and average stage time."""
+    db = get_db()
+
+    stats = {s["_id"]: s for s in db.employee_stats.find()}
+    employees = db.employees.find({"is_active": True}, {"name": 1, "work_type": 1}).sort("name", 1)
+
+    return [
+        {
+            "employee_id": str(emp["_id"]),
+            "name": emp["name"],
+            "work_type": emp.get("work_type"),
+            "completed": stats.get(emp["_id"], {}).get("completed", 0),
+            "per_day": stats.get(emp["_id"], {}).get("per_day", 0),
+            "stages": stats.get(emp["_id"], {}).get("stages", []),
+            "computed_at": stats.get(emp["_id"], {}).get("computed_at"),
+        }
+        for emp in employees
+    ]
+
+
+@router.post("/stats/refresh")
+def refresh_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_db()
+    count = refresh_karigar_stats(db)
+    return {"message": "Karigar stats refreshed", "employees": count}
+
 @router.get("/{employee_id}/status")
 def employee_salary_status(
     employee_id: str,
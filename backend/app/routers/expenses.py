@@ -1,24 +1,20 @@
-from fastapi import APIRouter, Depends
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, date
+from itertools import islice
 from typing import Optional
 
 from app.core.database import get_db
 from app.core.auth_dependencies import get_current_user
 from app.models.expense import ExpenseCreate
 from app.utils.bson import serialize_doc
+from app.utils.dates import today_range, month_range, date_range, iter_periods, PERIOD_UNITS
 
 router = APIRouter(
     prefix="/expenses",
     tags=["Expenses"]
 )
 
-# -------------------------
-# Helpers
-# -------------------------
-def today_range():
-    start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
-    end = start + timedelta(days=1)
-    return start, end
+MAX_PIVOT_PERIODS = 400
 
 
 # -------------------------
@@ -107,8 +103,7 @@ def monthly_expense_summary(
 ):
     db = get_db()
 
-    start = datetime(year, month, 1)
-    end = datetime(year + (month // 12), ((month % 12) + 1), 1)
+    start, end = month_range(year, month)
 
     match = {
         "created_at": {"$gte": start, "$lt": end}
@@ -133,3 +128,82 @@ def monthly_expense_summary(
         "expense_type": expense_type or "ALL",
         "breakdown": list(db.expenses.aggregate(pipeline))
     }
+
+
+# -------------------------
+# Expense Pivot (category x period)
+# -------------------------
+@router.get("/pivot")
+def expense_pivot(
+    start: date,
+    end: date,
+    granularity: str = "month",
+    expense_type: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Category x period totals for [start, end] (both inclusive).
+
+    One $group on $dateTrunc replaces one monthly-summary call per month.
+    Periods with no spending are included as zeros so the grid is dense.
+    """
+    if granularity not in PERIOD_UNITS:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(PERIOD_UNITS)}")
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    if end >= date.max:
+        raise HTTPException(status_code=400, detail="end is out of range")
+
+    range_start, range_end = date_range(start, end)
+    # Stops one past the cap instead of listing every period of a huge range
+    periods = list(islice(iter_periods(range_start, range_end, granularity), MAX_PIVOT_PERIODS + 1))
+    if len(periods) > MAX_PIVOT_PERIODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large for {granularity} granularity"
+        )
+
+    db = get_db()
+
+    match = {"created_at": {"$gte": range_start, "$lt": range_end}}
+    if expense_type:
+        match["expense_type"] = expense_type
+
+    trunc = {"date": "$created_at", "unit": granularity}
+    if granularity == "week":
+        trunc["startOfWeek"] = "monday"
+
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {
+                    "period": {"$dateTrunc": trunc},
+                    "category": "$category"
+                },
+                "total": {"$sum": "$amount"}
+            }
+        }
+    ]
+
+    index = {p: i for i, p in enumerate(periods)}
+    matrix = {}
+    for row in db.expenses.aggregate(pipeline):
+        category = row["_id"]["category"] or "Uncategorized"
+        cells = matrix.setdefault(category, [0] * len(periods))
+        cells[index[row["_id"]["period"]]] += row["total"]
+
+    categories = sorted(matrix)
+
+    return {
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "expense_type": expense_type or "ALL",
+        "periods": periods,
+        "categories": categories,
+        "matrix": {c: matrix[c] for c in categories},
+        "category_totals": {c: sum(matrix[c]) for c in categories},
+        "period_totals": [sum(matrix[c][i] for c in categories) for i in range(len(periods))],
+    }
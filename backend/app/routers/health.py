@@ -1,12 +1,16 @@
-from fastapi import APIRouter
+import os
+from fastapi import APIRouter, Request
 from app.core.database import get_db
 
 router = APIRouter()
 
 @router.get("/health")
-def health_check():
+def health_check(request: Request):
     db = get_db()
     return {
         "status": "ok",
-        "database": db.name
+        "database": db.name,
+        # False until the background index / cache warm-up has finished
+        "warm": request.app.state.warm,
+        "pid": os.getpid()
     }
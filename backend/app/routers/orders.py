@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import UpdateOne
 
-from app.core.database import get_db
+from app.core.database import get_db, run_transaction
 from app.core.auth_dependencies import get_current_user
-from app.models.order import OrderCreate
+from app.models.order import OrderCreate, OrderBulkStatusUpdate, OrderStatus
 from app.utils.bson import serialize_doc
+from app.utils.measurements import store_measurement_set, resolve_measurements
 
 router = APIRouter(
     prefix="/orders",
@@ -67,7 +69,12 @@ def create_order(
         "order_type": order.order_type,
         "price": order.price,
         "advance_amount": order.advance_amount,
-        "measurements_snapshot": order.measurements,
+
+        # maintained by payments against this order (see order_balance)
+        "paid_total": order.advance_amount,
+        "balance": order.price - order.advance_amount,
+        # 🔒 immutable snapshot, stored once per distinct set
+        "measurements_ref": store_measurement_set(db, order.measurements),
 
         # 🔒 immutable snapshot
         "cloth_used": [
@@ -93,7 +100,28 @@ def create_order(
         "is_active": True
     }
 
-    result = db.orders.insert_one(doc)
+    def insert_order(session):
+        result = db.orders.insert_one(doc, session=session)
+
+        # 💰 The order's bill and advance go into the payments ledger once,
+        # here, in the same transaction as the order whose paid_total the
+        # advance seeds. Clients must not post a separate payment for it.
+        if order.price > 0 or order.advance_amount > 0:
+            db.payments.insert_one({
+                "customer_id": customer["_id"],
+                "order_id": result.inserted_id,
+                "customer_name": customer["name"],
+                "total_bill": order.price,
+                "paid_amount": order.advance_amount,
+                "payment_mode": order.payment_mode or "Cash",
+                "payment_type": "Advance",
+                "due_date": doc["delivery_date"],
+                "created_at": doc["created_at"],
+                "created_by": current_user["username"],
+            }, session=session)
+        return result
+
+    result = run_transaction(insert_order)
 
     # Deduct cloth immediately AND log usage
     # Deduct cloth immediately AND log usage
@@ -145,10 +173,187 @@ def list_orders(
     if customer_id:
         query["customer_id"] = ObjectId(customer_id)
         
-    orders = db.orders.find(query).sort("created_at", -1)
+    # Measurements are only needed on the single-order / invoice view
+    orders = db.orders.find(query, {"measurements_snapshot": 0}).sort("created_at", -1)
     return [serialize_doc(o) for o in orders]
 
 
+# =========================
+# KARIGAR WORKLOAD
+# =========================
+OPEN_STATUSES = ["Received", "Cutting", "Stitching", "Finishing"]
+
+
+def get_active_employee(db, employee_id: str):
+    employee = db.employees.find_one(
+        {"_id": ObjectId(employee_id), "is_active": True},
+        {"name": 1}
+    )
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return employee
+
+
+def assignment_fields(employee: dict) -> dict:
+    return {
+        "assigned_employee_id": employee["_id"],
+        "assigned_employee_name": employee["name"],
+    }
+
+
+@router.get("/workload")
+def karigar_workload(
+    current_user: dict = Depends(get_current_user)
+):
+    """Open orders per assigned employee and stage (unassigned included)."""
+    db = get_db()
+
+    pipeline = [
+        {"$match": {"is_active": True, "status": {"$in": OPEN_STATUSES}}},
+        {
+            "$group": {
+                "_id": {
+                    "employee_id": "$assigned_employee_id",
+                    "status": "$status"
+                },
+                "employee_name": {"$first": "$assigned_employee_name"},
+                "count": {"$sum": 1},
+                "next_delivery": {"$min": "$delivery_date"}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.employee_id",
+                "employee_name": {"$first": "$employee_name"},
+                "open_items": {"$sum": "$count"},
+                "stages": {
+                    "$push": {
+                        "status": "$_id.status",
+                        "count": "$count",
+                        "next_delivery": "$next_delivery"
+                    }
+                }
+            }
+        },
+        {"$sort": {"open_items": -1}}
+    ]
+
+    rows = list(db.orders.aggregate(pipeline))
+
+    return [
+        {
+            "employee_id": str(r["_id"]) if r["_id"] else None,
+            "employee_name": r.get("employee_name") or "Unassigned",
+            "open_items": r["open_items"],
+            "by_stage": {
+                s["status"]: s["count"] for s in r["stages"]
+            },
+            "next_delivery": min(s["next_delivery"] for s in r["stages"]),
+        }
+        for r in rows
+    ]
+
+
+# =========================
+# PRODUCTION BOARD
+# =========================
+# Unknown / missing priority sorts with Normal
+PRIORITY_RANK = {"Urgent": 0, "High": 1, "Normal": 2, "Low": 3}
+
+# The Delivered column only shows recent deliveries; older ones are in
+# the order list and customer history
+BOARD_DELIVERED_DAYS = 30
+
+BOARD_FIELDS = {
+    "order_number": 1,
+    "customer_name": 1,
+    "order_type": 1,
+    "status": 1,
+    "delivery_date": 1,
+    "priority": 1,
+    "assigned_employee_id": 1,
+    "assigned_employee_name": 1,
+}
+
+
+@router.get("/board")
+def order_board(
+    limit: int = Query(20, ge=1, le=100),
+    status: Optional[OrderStatus] = None,
+    skip: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """Active orders per status column, soonest delivery first.
+
+    Without `status` every column returns its first `limit` orders. A
+    column loads more on its own by passing `status` and `skip`, which
+    returns just that column. Delivered is limited to orders due in the
+    last BOARD_DELIVERED_DAYS days.
+    """
+    db = get_db()
+
+    columns = [status.value] if status else [s.value for s in OrderStatus]
+    offset = skip if status else 0
+
+    # One index range per column, so the delivered history is never scanned
+    delivered_since = datetime.combine(
+        datetime.utcnow().date() - timedelta(days=BOARD_DELIVERED_DAYS), datetime.min.time()
+    )
+    column_filters = [
+        {"status": column, "delivery_date": {"$gte": delivered_since}}
+        if column == "Delivered" else {"status": column}
+        for column in columns
+    ]
+
+    rank = {
+        "$switch": {
+            "branches": [
+                {"case": {"$eq": ["$priority", name]}, "then": value}
+                for name, value in PRIORITY_RANK.items()
+            ],
+            "default": PRIORITY_RANK["Normal"]
+        }
+    }
+
+    facets = {
+        "counts": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    }
+    for column in columns:
+        # $sort + $limit keeps only the top skip+limit per column in memory
+        facets[column] = [
+            {"$match": {"status": column}},
+            {"$sort": {"delivery_date": 1, "priority_rank": 1, "_id": 1}},
+            {"$skip": offset},
+            {"$limit": limit},
+        ]
+
+    pipeline = [
+        # served by the (is_active, status, delivery_date) index
+        {"$match": {"is_active": True, "$or": column_filters}},
+        {"$project": {**BOARD_FIELDS, "priority_rank": rank}},
+        {"$facet": facets},
+    ]
+
+    result = next(db.orders.aggregate(pipeline))
+    counts = {c["_id"]: c["count"] for c in result["counts"]}
+
+    board = []
+    for column in columns:
+        items = result[column]
+        for item in items:
+            item.pop("priority_rank", None)
+        count = counts.get(column, 0)
+        board.append({
+            "status": column,
+            "count": count,
+            "skip": offset,
+            "has_more": offset + len(items) < count,
+            "orders": [serialize_doc(o) for o in items],
+        })
+
+    return board
+
+
 # =========================
 # GET SINGLE ORDER
 # =========================
@@ -161,6 +366,8 @@ def get_order(
     order = db.orders.find_one({"_id": ObjectId(order_id)})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+
+    order["measurements_snapshot"] = resolve_measurements(order)
     return serialize_doc(order)
 
 
@@ -171,6 +378,7 @@ def get_order(
 def update_order_status(
     order_id: str,
     status: str,
+    employee_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     if status not in VALID_STATUSES:
@@ -184,20 +392,28 @@ def update_order_status(
 
     db = get_db()
 
+    now = datetime.utcnow()
+    updates = {
+        "status": status,
+        "updated_at": now
+    }
+    event = {
+        "status": status,
+        "changed_at": now,
+        "changed_by": current_user["username"]
+    }
+
+    # 🧵 Whoever picks up this stage becomes the assigned karigar
+    if employee_id:
+        employee = get_active_employee(db, employee_id)
+        updates.update(assignment_fields(employee))
+        event["employee_id"] = employee["_id"]
+
     result = db.orders.update_one(
         {"_id": ObjectId(order_id), "is_active": True},
         {
-            "$set": {
-                "status": status,
-                "updated_at": datetime.utcnow()
-            },
-            "$push": {
-                "status_history": {
-                    "status": status,
-                    "changed_at": datetime.utcnow(),
-                    "changed_by": current_user["username"]
-                }
-            }
+            "$set": updates,
+            "$push": {"status_history": event}
         }
     )
 
@@ -207,6 +423,196 @@ def update_order_status(
     return {"message": "Order status updated"}
 
 
+# =========================
+# BULK STATUS UPDATE
+# =========================
+def allowed_from(status: str) -> list:
+    """Statuses an order may be moved to `status` from.
+
+    Bulk moves only go forward through the workflow; sending an order
+    back a stage is done one at a time with PUT /orders/{id}/status.
+    """
+    if status == "Ready":
+        return ["Finishing"]
+    if status == "Delivered":
+        return ["Ready"]
+    return OPEN_STATUSES[:OPEN_STATUSES.index(status)]
+
+
+@router.post("/bulk-status")
+def bulk_update_order_status(
+    data: OrderBulkStatusUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Move many orders to one status (e.g. end of shift Cutting -> Stitching).
+
+    Every order gets its own outcome; one bad id doesn't block the rest.
+    Ready follows the mark-ready rules: confirmation is required, only
+    Finishing orders qualify and their cloth usage is logged.
+    """
+    status = data.status.value
+
+    if status == "Ready" and not data.confirm:
+        raise HTTPException(
+            status_code=400,
+            detail="Confirmation required to mark orders as Ready"
+        )
+
+    db = get_db()
+
+    # Mongo keeps milliseconds; trimmed so `now` can be matched back below
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    updates = {"status": status, "updated_at": now}
+    if status == "Ready":
+        updates["ready_at"] = now
+    event = {
+        "status": status,
+        "changed_at": now,
+        "changed_by": current_user["username"]
+    }
+
+    if data.employee_id:
+        employee = get_active_employee(db, data.employee_id)
+        updates.update(assignment_fields(employee))
+        event["employee_id"] = employee["_id"]
+
+    results = {}
+    ids = []
+    for order_id in dict.fromkeys(data.order_ids):
+        if ObjectId.is_valid(order_id):
+            ids.append(ObjectId(order_id))
+        else:
+            results[order_id] = {"ok": False, "error": "Invalid order id"}
+
+    orders = {
+        o["_id"]: o
+        for o in db.orders.find(
+            {"_id": {"$in": ids}, "is_active": True},
+            {"status": 1, "order_type": 1, "cloth_used": 1}
+        )
+    }
+
+    sources = allowed_from(status)
+    ops = []
+    moving = []
+    for oid in ids:
+        order = orders.get(oid)
+        if not order:
+            results[str(oid)] = {"ok": False, "error": "Order not found"}
+            continue
+        if order["status"] not in sources:
+            results[str(oid)] = {
+                "ok": False,
+                "error": f"Cannot move from {order['status']} to {status}"
+            }
+            continue
+
+        # Matching on the status we validated keeps a concurrent change
+        # from being overwritten
+        ops.append(UpdateOne(
+            {"_id": oid, "is_active": True, "status": order["status"]},
+            {"$set": updates, "$push": {"status_history": event}}
+        ))
+        moving.append(oid)
+
+    if ops:
+        result = db.orders.bulk_write(ops, ordered=False)
+
+        if result.matched_count < len(ops):
+            # Some orders changed in between; find out which ones we moved
+            moved = {
+                o["_id"]
+                for o in db.orders.find(
+                    {"_id": {"$in": moving}, "status": status, "updated_at": now},
+                    {"_id": 1}
+                )
+            }
+        else:
+            moved = set(moving)
+
+        for oid in moving:
+            if oid in moved:
+                results[str(oid)] = {"ok": True, "status": status}
+            else:
+                results[str(oid)] = {"ok": False, "error": "Order changed, try again"}
+
+        if status == "Ready":
+            usage = [
+                {
+                    "stock_id": item["cloth_stock_id"],
+                    "order_id": oid,
+                    "meters_used": item["meters_used"],
+                    "used_for": orders[oid]["order_type"],
+                    "used_by": current_user["username"],
+                    "used_at": now,
+                    "stage": "Ready"
+                }
+                for oid in moving if oid in moved
+                for item in orders[oid].get("cloth_used", [])
+            ]
+            if usage:
+                db.cloth_usage.insert_many(usage)
+
+    updated = sum(1 for r in results.values() if r["ok"])
+
+    return {
+        "updated": updated,
+        "failed": len(results) - updated,
+        "results": [
+            {"order_id": order_id, **results[order_id]}
+            for order_id in dict.fromkeys(data.order_ids)
+        ]
+    }
+
+
+# =========================
+# ASSIGN KARIGAR
+# =========================
+@router.put("/{order_id}/assign")
+def assign_order(
+    order_id: str,
+    employee_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_db()
+
+    employee = get_active_employee(db, employee_id)
+
+    order = db.orders.find_one(
+        {"_id": ObjectId(order_id), "is_active": True},
+        {"status": 1}
+    )
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    # The event keeps the current status and credits the rest of this
+    # stage to the new karigar (see karigar_stats)
+    now = datetime.utcnow()
+    event = {
+        "status": order["status"],
+        "employee_id": employee["_id"],
+        "changed_at": now,
+        "changed_by": current_user["username"],
+        "assigned": True
+    }
+
+    # Matching on the status read above, so a concurrent status change
+    # isn't recorded under the old one
+    result = db.orders.update_one(
+        {"_id": order["_id"], "is_active": True, "status": order["status"]},
+        {
+            "$set": {**assignment_fields(employee), "updated_at": now},
+            "$push": {"status_history": event}
+        }
+    )
+
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Order changed, try again")
+
+    return {"message": f"Order assigned to {employee['name']}"}
+
+
 # =========================
 # MARK READY (CONFIRMED)
 # =========================
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from datetime import datetime
 from typing import List
+from pymongo import ReturnDocument
 
-from app.core.database import get_db
+from app.core.database import get_db, run_transaction
 from app.core.auth_dependencies import get_current_user
 from app.models.owner import OwnerCreate, OwnerUpdate, OwnerOut
 from app.utils.bson import serialize_doc
+from app.utils.dates import year_range
 from bson import ObjectId
 
 router = APIRouter(
@@ -36,6 +38,13 @@ def create_owner(
         new_owner["joined_date"] = datetime.utcnow()
 
     res = db.owners.insert_one(new_owner)
+
+    if owner.initial_investment > 0:
+        new_owner["_id"] = res.inserted_id
+        record_owner_transaction(
+            db, new_owner, "investment", owner.initial_investment,
+            "Initial investment", current_user.get("username")
+        )
     
     return {
         "message": "Partner profile created successfully",
@@ -48,6 +57,75 @@ def list_owners(current_user: dict = Depends(get_current_user)):
     owners = list(db.owners.find({"is_active": True}).sort("created_at", -1))
     return [serialize_doc(o) for o in owners]
 
+# PROFIT DISTRIBUTION
+# Monthly profit for a year, split across active partners by share.
+@router.get("/profit-distribution")
+def profit_distribution(
+    year: int,
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_db()
+    start, end = year_range(year)
+
+    # Income and expenses in one pass: union the two collections and
+    # group by month.
+    pipeline = [
+        {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+        {"$project": {"created_at": 1, "income": "$paid_amount", "expense": {"$literal": 0}}},
+        {
+            "$unionWith": {
+                "coll": "expenses",
+                "pipeline": [
+                    {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+                    {"$project": {"created_at": 1, "income": {"$literal": 0}, "expense": "$amount"}}
+                ]
+            }
+        },
+        {
+            "$group": {
+                "_id": {"$month": "$created_at"},
+                "income": {"$sum": "$income"},
+                "expense": {"$sum": "$expense"}
+            }
+        }
+    ]
+
+    by_month = {r["_id"]: r for r in db.payments.aggregate(pipeline)}
+
+    partners = list(db.owners.find(
+        {"is_active": True, "share_percentage": {"$gt": 0}},
+        {"name": 1, "share_percentage": 1}
+    ))
+
+    months = []
+    for month in range(1, 13):
+        row = by_month.get(month, {})
+        income = row.get("income", 0)
+        expense = row.get("expense", 0)
+        profit = income - expense
+        months.append({
+            "month": month,
+            "income": income,
+            "expense": expense,
+            "profit": profit,
+            "shares": [
+                {
+                    "owner_id": str(p["_id"]),
+                    "name": p["name"],
+                    "share_percentage": p["share_percentage"],
+                    "amount": round(profit * p["share_percentage"] / 100, 2)
+                }
+                for p in partners
+            ]
+        })
+
+    return {
+        "year": year,
+        "total_profit": sum(m["profit"] for m in months),
+        "allocated_percentage": sum(p["share_percentage"] for p in partners),
+        "months": months
+    }
+
 @router.get("/{owner_id}", response_model=dict)
 def get_owner(owner_id: str, current_user: dict = Depends(get_current_user)):
     db = get_db()
@@ -93,8 +171,58 @@ def delete_owner(owner_id: str, current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Owner not found")
     return {"message": "Owner profile deactivated"}
 
-# WITHDRAWAL / EXPENSE TRACKING
-# This endpoint allows recording a personal withdrawal or expense against an owner
+# -------------------------------
+# EQUITY LEDGER
+# -------------------------------
+# Partner money movements live in owner_transactions, not in expenses:
+# they are equity, and keeping them out of expenses keeps P&L honest.
+LEDGER_SIGN = {
+    "investment": 1,
+    "deposit": 1,
+    "withdrawal": -1,
+}
+
+
+def record_owner_transaction(db, owner: dict, kind: str, amount: float, note: str, username: str,
+                             session=None):
+    now = datetime.utcnow()
+    db.owner_transactions.insert_one({
+        "owner_id": owner["_id"],
+        "owner_name": owner["name"],
+        "type": kind,
+        "amount": amount,
+        "signed_amount": LEDGER_SIGN[kind] * amount,
+        "note": note,
+        "at": now,
+        "created_by": username
+    }, session=session)
+
+
+def move_drawings(db, owner_id: str, kind: str, amount: float, note: str, username: str):
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+
+    # The counter and its ledger entry commit together
+    def move(session):
+        # $inc and read back in one atomic step; no stale read-modify-write
+        owner = db.owners.find_one_and_update(
+            {"_id": ObjectId(owner_id)},
+            {"$inc": {"total_withdrawn": amount if kind == "withdrawal" else -amount}},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if owner:
+            record_owner_transaction(db, owner, kind, amount, note, username, session=session)
+        return owner
+
+    owner = run_transaction(move)
+    if not owner:
+        raise HTTPException(status_code=404, detail="Owner not found")
+    return owner
+
+
+# WITHDRAWAL
+# This endpoint allows recording a personal withdrawal against an owner
 @router.post("/{owner_id}/withdraw")
 def record_withdrawal(
     owner_id: str,
@@ -103,37 +231,10 @@ def record_withdrawal(
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
-    
-    owner = db.owners.find_one({"_id": ObjectId(owner_id)})
-    if not owner:
-        raise HTTPException(status_code=404, detail="Owner not found")
-        
-    # 1. Update owner's total withdrawn
-    db.owners.update_one(
-        {"_id": ObjectId(owner_id)},
-        {"$inc": {"total_withdrawn": amount}}
-    )
-    
-    # 2. Record as an expense in the main expenses table too?
-    # Usually partner withdrawal is an 'Equity' transaction, not strictly a business 'Expense' for P&L, 
-    # but for simple shops, it's often treated as an expense or just cash out.
-    # Let's record it in a separate 'withdrawals' collection or just add to expenses with a special tag.
-    # Approach for now: Record in 'expenses' collection with type 'Withdrawal' linked to owner.
-    
-    withdrawal_doc = {
-        "description": f"Withdrawal by {owner['name']}: {note}",
-        "amount": amount,
-        "category": "Salary/Drawings",
-        "expense_type": "Withdrawal",
-        "owner_id": ObjectId(owner_id),
-        "owner_name": owner['name'],
-        "created_at": datetime.utcnow(),
-        "created_by": current_user.get("username")
-    }
-    
-    db.expenses.insert_one(withdrawal_doc)
-    
-    return {"message": "Withdrawal recorded successfully", "new_total": owner.get("total_withdrawn", 0) + amount}
+
+    owner = move_drawings(db, owner_id, "withdrawal", amount, note, current_user.get("username"))
+
+    return {"message": "Withdrawal recorded successfully", "new_total": owner["total_withdrawn"]}
 
 
 # DEPOSIT / PAYBACK
@@ -146,30 +247,45 @@ def record_deposit(
     current_user: dict = Depends(get_current_user)
 ):
     db = get_db()
-    
-    owner = db.owners.find_one({"_id": ObjectId(owner_id)})
-    if not owner:
-        raise HTTPException(status_code=404, detail="Owner not found")
-        
-    # 1. Decrease owner's total withdrawn
-    db.owners.update_one(
-        {"_id": ObjectId(owner_id)},
-        {"$inc": {"total_withdrawn": -amount}}
-    )
-    
-    # 2. Record this as a 'Deposit' (Entry in expenses for record keeping, but positive flow)
-    # in a real accounting system this would be different, but here we just track flow.
-    deposit_doc = {
-        "description": f"Deposit by {owner['name']}: {note}",
-        "amount": amount, 
-        "category": "Salary/Drawings",
-        "expense_type": "Deposit",  # Distinct type
-        "owner_id": ObjectId(owner_id),
-        "owner_name": owner['name'],
-        "created_at": datetime.utcnow(),
-        "created_by": current_user.get("username")
+
+    owner = move_drawings(db, owner_id, "deposit", amount, note, current_user.get("username"))
+
+    return {"message": "Deposit recorded successfully", "new_total": owner["total_withdrawn"]}
+
+
+# LEDGER WITH RUNNING BALANCE
+@router.get("/{owner_id}/ledger")
+def owner_ledger(
+    owner_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    db = get_db()
+
+    pipeline = [
+        {"$match": {"owner_id": ObjectId(owner_id)}},
+        {"$sort": {"at": 1}},
+        {
+            "$setWindowFields": {
+                "partitionBy": "$owner_id",
+                "sortBy": {"at": 1},
+                "output": {
+                    "running_balance": {
+                        "$sum": "$signed_amount",
+                        "window": {"documents": ["unbounded", "current"]}
+                    }
+                }
+            }
+        },
+        # newest first, capped after the running total is computed
+        {"$sort": {"at": -1}},
+        {"$limit": limit}
+    ]
+
+    entries = [serialize_doc(e) for e in db.owner_transactions.aggregate(pipeline)]
+
+    return {
+        "owner_id": owner_id,
+        "balance": entries[0]["running_balance"] if entries else 0,
+        "entries": entries
     }
-    
-    db.expenses.insert_one(deposit_doc)
-    
-    return {"message": "Deposit recorded successfully", "new_total": owner.get("total_withdrawn", 0) - amount}
@@ -1,18 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime, date
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from typing import Optional
 
-from app.core.database import get_db
+from app.core.database import get_db, run_transaction
 from app.core.auth_dependencies import get_current_user
-from app.models.payment import PaymentCreate
+from app.models.payment import PaymentCreate, PaymentBatch
 from app.utils.bson import serialize_doc
+from app.utils.order_balance import apply_order_payment, order_payment_ops
 
 router = APIRouter(
     prefix="/payments",
     tags=["Payments"]
 )
 
+# -------------------------------
+# HELPERS
+# -------------------------------
+def payment_due_date(payment: PaymentCreate):
+    # -------------------------------
+    # SAFE DUE DATE HANDLING
+    # -------------------------------
+    due_date = None
+    if getattr(payment, "due_date", None):
+        if isinstance(payment.due_date, str):
+            try:
+                due_date = datetime.fromisoformat(payment.due_date)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid due date format")
+        elif isinstance(payment.due_date, datetime):
+            due_date = payment.due_date
+        elif isinstance(payment.due_date, date):
+            # BSON has no date type; store midnight of the due day
+            due_date = datetime.combine(payment.due_date, datetime.min.time())
+    return due_date
+
+
+def payment_doc(payment: PaymentCreate, customer: dict, username: str, now: datetime):
+    return {
+        "customer_id": customer["_id"],
+        "order_id": ObjectId(payment.order_id) if payment.order_id else None,
+        "customer_name": customer["name"],
+        "total_bill": payment.total_bill,
+        "paid_amount": payment.paid_amount,
+        "payment_mode": payment.payment_mode,
+        "due_date": payment_due_date(payment),
+        "created_at": now,
+        "created_by": username,
+    }
+
 # -------------------------------
 # CREATE PAYMENT
 # -------------------------------
@@ -34,36 +71,153 @@ def add_payment(
     if payment.paid_amount <= 0:
         raise HTTPException(status_code=400, detail="Invalid payment amount")
 
-    # -------------------------------
-    # SAFE DUE DATE HANDLING
-    # -------------------------------
-    due_date = None
-    if getattr(payment, "due_date", None):
-        if isinstance(payment.due_date, str):
-            try:
-                due_date = datetime.fromisoformat(payment.due_date)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid due date format")
-        elif isinstance(payment.due_date, datetime):
-            due_date = payment.due_date
+    if payment.order_id:
+        order = db.orders.find_one(
+            {"_id": ObjectId(payment.order_id), "customer_id": customer["_id"], "is_active": True},
+            {"_id": 1}
+        )
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found for this customer")
 
-    doc = {
-        "customer_id": ObjectId(payment.customer_id),
-        "customer_name": customer["name"],
-        "total_bill": payment.total_bill,
-        "paid_amount": payment.paid_amount,
-        "payment_mode": payment.payment_mode,
-        "due_date": due_date,
-        "created_at": datetime.utcnow(),
-        "created_by": current_user["username"],
-    }
+    doc = payment_doc(payment, customer, current_user["username"], datetime.utcnow())
 
-    db.payments.insert_one(doc)
+    # The payment and the order balance it changes commit together
+    def record(session):
+        db.payments.insert_one(doc, session=session)
+        if doc["order_id"]:
+            apply_order_payment(db, doc["order_id"], doc["paid_amount"], session=session)
+
+    run_transaction(record)
 
     return {
         "message": "Payment recorded successfully"
     }
 
+# -------------------------------
+# BATCH PAYMENTS (END OF DAY)
+# -------------------------------
+@router.post("/batch")
+def add_payments_batch(
+    batch: PaymentBatch,
+    current_user: dict = Depends(get_current_user)
+):
+    """Record many collections at once.
+
+    All customers are checked with one $in query and all valid payments
+    go in with one unordered insert_many; invalid items are reported per
+    index without blocking the rest.
+    """
+    db = get_db()
+
+    results = [None] * len(batch.payments)
+
+    customer_ids = set()
+    order_ids = set()
+    for i, payment in enumerate(batch.payments):
+        if not ObjectId.is_valid(payment.customer_id):
+            results[i] = {"index": i, "status": "error", "error": "Invalid customer id"}
+        elif payment.order_id and not ObjectId.is_valid(payment.order_id):
+            results[i] = {"index": i, "status": "error", "error": "Invalid order id"}
+        elif payment.paid_amount <= 0:
+            results[i] = {"index": i, "status": "error", "error": "Invalid payment amount"}
+        else:
+            customer_ids.add(ObjectId(payment.customer_id))
+            if payment.order_id:
+                order_ids.add(ObjectId(payment.order_id))
+
+    customers = {
+        c["_id"]: c
+        for c in db.customers.find(
+            {"_id": {"$in": list(customer_ids)}, "is_active": True},
+            {"name": 1}
+        )
+    }
+
+    # order id -> owning customer id
+    order_owners = {
+        o["_id"]: o["customer_id"]
+        for o in db.orders.find(
+            {"_id": {"$in": list(order_ids)}, "is_active": True},
+            {"customer_id": 1}
+        )
+    } if order_ids else {}
+
+    now = datetime.utcnow()
+    pending = []  # (index, doc)
+
+    for i, payment in enumerate(batch.payments):
+        if results[i]:
+            continue
+
+        customer = customers.get(ObjectId(payment.customer_id))
+        if not customer:
+            results[i] = {"index": i, "status": "error", "error": "Customer not found"}
+            continue
+
+        if payment.order_id and order_owners.get(ObjectId(payment.order_id)) != customer["_id"]:
+            results[i] = {"index": i, "status": "error", "error": "Order not found for this customer"}
+            continue
+
+        try:
+            doc = payment_doc(payment, customer, current_user["username"], now)
+        except HTTPException as e:
+            results[i] = {"index": i, "status": "error", "error": e.detail}
+            continue
+
+        pending.append((i, doc))
+
+    def record(session):
+        """Insert the payments and move the order balances; returns failed positions."""
+        docs = [doc for _, doc in pending]
+        failed = {}
+        try:
+            db.payments.insert_many(docs, ordered=False, session=session)
+        except BulkWriteError as e:
+            if session is not None:
+                raise  # the transaction is aborted, nothing was written
+            failed = {
+                err["index"]: err.get("errmsg", "Insert failed")
+                for err in e.details.get("writeErrors", [])
+            }
+
+        # Order balances: one $inc-style update per touched order, one round trip
+        order_amounts = {}
+        for pos, (_, doc) in enumerate(pending):
+            if doc["order_id"] and pos not in failed:
+                order_amounts[doc["order_id"]] = order_amounts.get(doc["order_id"], 0) + doc["paid_amount"]
+        if order_amounts:
+            db.orders.bulk_write(order_payment_ops(order_amounts), ordered=False, session=session)
+        return failed
+
+    if pending:
+        try:
+            failed = run_transaction(record)
+        except BulkWriteError as e:
+            message = "Batch not saved: " + next(
+                (err.get("errmsg", "") for err in e.details.get("writeErrors", [])), "insert failed"
+            )
+            failed = {pos: message for pos in range(len(pending))}
+
+        for pos, (i, doc) in enumerate(pending):
+            if pos in failed:
+                results[i] = {"index": i, "status": "error", "error": failed[pos]}
+            else:
+                results[i] = {"index": i, "status": "created", "payment_id": str(doc["_id"])}
+
+    created = sum(1 for r in results if r["status"] == "created")
+    collected = sum(
+        doc["paid_amount"] for i, doc in pending
+        if results[i]["status"] == "created"
+    )
+
+    return {
+        "message": f"{created} of {len(results)} payments recorded",
+        "created": created,
+        "failed": len(results) - created,
+        "total_collected": collected,
+        "results": results
+    }
+
 # -------------------------------
 # LIST PAYMENTS BY CUSTOMER
 # -------------------------------
@@ -96,6 +250,7 @@ def list_payments(
             **p,
             "_id": str(p["_id"]),
             "customer_id": str(p["customer_id"]),
+            "order_id": str(p["order_id"]) if p.get("order_id") else None,
         }
         for p in payments
     ]
@@ -110,6 +265,9 @@ def customer_payment_summary(
     db = get_db()
 
     pipeline = [
+        # Sort first so $last is the most recent entry, not whatever
+        # order the documents happen to come back in
+        {"$sort": {"created_at": 1}},
         {
             "$group": {
                 "_id": "$customer_id",
@@ -117,7 +275,7 @@ def customer_payment_summary(
                 "total_bill": {"$sum": "$total_bill"},
                 "paid_amount": {"$sum": "$paid_amount"},
                 "last_payment_date": {"$max": "$created_at"},
-                "due_date": {"$last": "$due_date"},
+                "due_date": {"$max": "$due_date"},
             }
         },
         {
@@ -153,6 +311,170 @@ def customer_payment_summary(
         for r in result
     ]
 
+# -------------------------------
+# DUES AGING
+# -------------------------------
+AGING_BUCKETS = [
+    (30, "0-30"),
+    (60, "31-60"),
+    (90, "61-90"),
+]
+AGING_OVERFLOW = "90+"
+
+CUSTOMER_CONTACT_LOOKUP = [
+    {
+        "$lookup": {
+            "from": "customers",
+            "localField": "_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"mobile": 1}}],
+            "as": "customer"
+        }
+    },
+    {"$addFields": {"customer_mobile": {"$first": "$customer.mobile"}}},
+    {"$project": {"customer": 0}},
+]
+
+
+def aging_row(r: dict) -> dict:
+    return {
+        "customer_id": str(r["_id"]),
+        "customer_name": r.get("customer_name"),
+        "customer_mobile": r.get("customer_mobile"),
+        "total_bill": r["total_bill"],
+        "paid_amount": r["paid_amount"],
+        "remaining_amount": r["remaining_amount"],
+        "due_date": r["due_date"],
+        "days_overdue": r["days_overdue"],
+        "bucket": r["bucket"],
+    }
+
+
+@router.get("/aging")
+def dues_aging(
+    top: int = Query(10, ge=1, le=100),
+    as_of: Optional[date] = None,
+    include_customers: bool = False,
+    min_days: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """Outstanding balances bucketed by days past their due date.
+
+    A customer's due date is the latest one promised across their
+    payments; only customers with a positive balance past that date count.
+    `include_customers=true` also returns the overdue list (what the
+    reminder screen needs), filtered to at least `min_days` overdue.
+    """
+    db = get_db()
+
+    as_of_dt = datetime.combine(as_of or datetime.utcnow().date(), datetime.min.time())
+
+    bucket_branches = [
+        {"case": {"$lte": ["$days_overdue", limit]}, "then": label}
+        for limit, label in AGING_BUCKETS
+    ]
+
+    facets = {
+        "buckets": [
+            {
+                "$group": {
+                    "_id": "$bucket",
+                    "count": {"$sum": 1},
+                    "total": {"$sum": "$remaining_amount"}
+                }
+            }
+        ],
+        "top_debtors": [
+            {"$sort": {"remaining_amount": -1}},
+            {"$limit": top},
+            *CUSTOMER_CONTACT_LOOKUP
+        ],
+    }
+    if include_customers:
+        facets["customers"] = [
+            {"$match": {"days_overdue": {"$gte": min_days}}},
+            {"$sort": {"days_overdue": -1, "remaining_amount": -1}},
+            *CUSTOMER_CONTACT_LOOKUP
+        ]
+
+    pipeline = [
+        # Only customers that ever had a due date before as_of can be
+        # overdue; the due_date index narrows the scan to them.
+        {"$match": {"due_date": {"$lt": as_of_dt}}},
+        {"$group": {"_id": "$customer_id"}},
+        # Full balance per candidate via the (customer_id, created_at) index
+        {
+            "$lookup": {
+                "from": "payments",
+                "localField": "_id",
+                "foreignField": "customer_id",
+                "pipeline": [
+                    {"$sort": {"created_at": 1}},
+                    {
+                        "$group": {
+                            "_id": None,
+                            "customer_name": {"$last": "$customer_name"},
+                            "total_bill": {"$sum": "$total_bill"},
+                            "paid_amount": {"$sum": "$paid_amount"},
+                            "due_date": {"$max": "$due_date"}
+                        }
+                    }
+                ],
+                "as": "totals"
+            }
+        },
+        {"$unwind": "$totals"},
+        {
+            "$project": {
+                "customer_name": "$totals.customer_name",
+                "total_bill": "$totals.total_bill",
+                "paid_amount": "$totals.paid_amount",
+                "due_date": "$totals.due_date",
+                "remaining_amount": {"$subtract": ["$totals.total_bill", "$totals.paid_amount"]}
+            }
+        },
+        {"$match": {"remaining_amount": {"$gt": 0}, "due_date": {"$lt": as_of_dt}}},
+        {
+            "$addFields": {
+                "days_overdue": {
+                    "$floor": {
+                        "$divide": [{"$subtract": [as_of_dt, "$due_date"]}, 86400000]
+                    }
+                }
+            }
+        },
+        {
+            "$addFields": {
+                "bucket": {"$switch": {"branches": bucket_branches, "default": AGING_OVERFLOW}}
+            }
+        },
+        {"$facet": facets}
+    ]
+
+    result = list(db.payments.aggregate(pipeline))[0]
+
+    found = {b["_id"]: b for b in result["buckets"]}
+    buckets = [
+        {
+            "bucket": label,
+            "count": found.get(label, {}).get("count", 0),
+            "total": found.get(label, {}).get("total", 0),
+        }
+        for label in [label for _, label in AGING_BUCKETS] + [AGING_OVERFLOW]
+    ]
+
+    response = {
+        "as_of": as_of_dt,
+        "buckets": buckets,
+        "total_overdue": sum(b["total"] for b in buckets),
+        "overdue_customers": sum(b["count"] for b in buckets),
+        "top_debtors": [aging_row(r) for r in result["top_debtors"]],
+    }
+    if include_customers:
+        response["customers"] = [aging_row(r) for r in result["customers"]]
+
+    return response
+
 # -------------------------------
 # DELETE PAYMENT
 # -------------------------------
@@ -163,11 +485,17 @@ def delete_payment(
 ):
     db = get_db()
     
-    result = db.payments.delete_one({
-        "_id": ObjectId(payment_id)
-    })
-    
-    if result.deleted_count == 0:
+    def remove(session):
+        deleted = db.payments.find_one_and_delete(
+            {"_id": ObjectId(payment_id)},
+            projection={"order_id": 1, "paid_amount": 1},
+            session=session
+        )
+        if deleted and deleted.get("order_id"):
+            apply_order_payment(db, deleted["order_id"], -deleted.get("paid_amount", 0), session=session)
+        return deleted
+
+    if not run_transaction(remove):
         raise HTTPException(status_code=404, detail="Payment not found")
-        
+
     return {"message": "Payment deleted successfully"}
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.core.config import settings
+from app.utils.photo_manifest import HASHED_NAME, lookup_photo
+from app.utils.storage import get_photo_storage
+
+router = APIRouter(
+    prefix="/static/photos",
+    tags=["Photos"]
+)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+@router.get("/{name:path}", name="serve_photo")
+def serve_photo(name: str, request: Request):
+    entry = lookup_photo(name)
+    if entry is None:
+        # Not on local disk. Object storage only ever receives hashed
+        # uploads, so those get a presigned URL and image bytes never pass
+        # through the API workers; photos from before the switch to object
+        # storage are still served from disk above. The redirect is
+        # cacheable for a bit less than the signature lifetime.
+        direct_url = get_photo_storage().presigned_url(name) if HASHED_NAME.match(name) else None
+        if direct_url:
+            return RedirectResponse(
+                direct_url,
+                status_code=307,
+                headers={"Cache-Control": f"private, max-age={max(settings.S3_PRESIGN_EXPIRES - 60, 0)}"}
+            )
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    path, stat, etag = entry.path, entry.stat, entry.etag
+    headers = {
+        "Cache-Control": IMMUTABLE if entry.immutable else REVALIDATE,
+        "Vary": "Accept-Encoding",
+    }
+
+    # Precompressed siblings are a different representation, so they get
+    # their own ETag. Range requests always get the identity bytes.
+    accepted = request.headers.get("accept-encoding", "")
+    if "range" not in request.headers:
+        for encoding, (encoded_path, encoded_stat) in entry.encodings.items():
+            if encoding in accepted:
+                path, stat = encoded_path, encoded_stat
+                etag = f'{etag[:-1]}-{encoding}"'
+                headers["Content-Encoding"] = encoding
+                break
+
+    headers["ETag"] = etag
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # Passing the manifest's stat_result skips the per-request os.stat();
+    # FileResponse handles Range / If-Range against our strong ETag.
+    return FileResponse(
+        path,
+        media_type=entry.media_type,
+        headers=headers,
+        stat_result=stat
+    )
@@ -0,0 +1,118 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+import re
+
+from app.core.database import get_db
+from app.core.auth_dependencies import get_current_user
+from app.utils.bson import serialize_doc
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+# Each entity: collection, base filter, identifier fields that also get an
+# anchored prefix match (text indexes only match whole tokens), and the
+# projection returned to the client.
+SEARCH_GROUPS = {
+    "orders": {
+        "collection": "orders",
+        "filter": {"is_active": True},
+        "prefix_fields": ["order_number", "customer_mobile"],
+        "projection": {
+            "order_number": 1,
+            "customer_id": 1,
+            "customer_name": 1,
+            "customer_mobile": 1,
+            "order_type": 1,
+            "status": 1,
+            "delivery_date": 1,
+        },
+    },
+    "customers": {
+        "collection": "customers",
+        "filter": {"is_active": True},
+        "prefix_fields": ["mobile"],
+        "projection": {
+            "name": 1,
+            "mobile": 1,
+            "category": 1,
+            "photo_url": 1,
+        },
+    },
+    "payments": {
+        "collection": "payments",
+        "filter": {},
+        "prefix_fields": [],
+        "projection": {
+            "customer_id": 1,
+            "customer_name": 1,
+            "paid_amount": 1,
+            "total_bill": 1,
+            "created_at": 1,
+        },
+    },
+    "cloth_stock": {
+        "collection": "cloth_stock",
+        "filter": {"is_active": True},
+        "prefix_fields": [],
+        "projection": {
+            "cloth_type": 1,
+            "dealer_name": 1,
+            "remaining_meters": 1,
+            "price_per_meter": 1,
+        },
+    },
+}
+
+
+def search_group(db, group: dict, q: str, limit: int):
+    collection = db[group["collection"]]
+
+    text_query = {**group["filter"], "$text": {"$search": q}}
+    projection = {**group["projection"], "score": {"$meta": "textScore"}}
+
+    hits = list(
+        collection.find(text_query, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .limit(limit)
+    )
+
+    # Partially typed order numbers / mobiles ("9876", "ORD-2025-00")
+    # are not whole tokens, so top up with an index-backed prefix match.
+    if len(hits) < limit and group["prefix_fields"] and " " not in q:
+        seen = {h["_id"] for h in hits}
+        prefix = {"$regex": f"^{re.escape(q)}"}
+        prefix_query = {
+            **group["filter"],
+            "_id": {"$nin": list(seen)},
+            "$or": [{field: prefix} for field in group["prefix_fields"]],
+        }
+        for doc in collection.find(prefix_query, group["projection"]).limit(limit - len(hits)):
+            doc["score"] = 0
+            hits.append(doc)
+
+    return [serialize_doc(h) for h in hits]
+
+
+@router.get("/")
+def global_search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(5, ge=1, le=25),
+    current_user: dict = Depends(get_current_user)
+):
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query required")
+
+    db = get_db()
+
+    results = {
+        name: search_group(db, group, q, limit)
+        for name, group in SEARCH_GROUPS.items()
+    }
+
+    return {
+        "query": q,
+        "results": results,
+        "counts": {name: len(hits) for name, hits in results.items()}
+    }
@@ -0,0 +1,61 @@
+from datetime import datetime, date, timedelta
+
+# All ranges are naive UTC datetimes, matching how created_at is stored
+# (datetime.utcnow()). Every range is half-open: start <= t < end.
+
+PERIOD_UNITS = ("day", "week", "month")
+
+
+def today_range():
+    start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    end = start + timedelta(days=1)
+    return start, end
+
+
+def month_range(year: int, month: int):
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def year_range(year: int):
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def date_range(start: date, end: date):
+    """Inclusive calendar dates -> half-open datetime range."""
+    return (
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end, datetime.min.time()) + timedelta(days=1),
+    )
+
+
+def period_start(value: datetime, unit: str) -> datetime:
+    """Python twin of $dateTrunc (weeks start on Monday)."""
+    day = datetime.combine(value.date(), datetime.min.time())
+    if unit == "day":
+        return day
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    if unit == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period unit: {unit}")
+
+
+def next_period(value: datetime, unit: str) -> datetime:
+    if unit == "day":
+        return value + timedelta(days=1)
+    if unit == "week":
+        return value + timedelta(weeks=1)
+    return month_range(value.year, value.month)[1]
+
+
+def iter_periods(start: datetime, end: datetime, unit: str):
+    """Every period start touching [start, end), empty ones included."""
+    current = period_start(start, unit)
+    while current < end:
+        yield current
+        try:
+            current = next_period(current, unit)
+        except (OverflowError, ValueError):
+            return  # past year 9999, so nothing is left in the range
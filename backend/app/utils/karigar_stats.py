@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+STATS_WINDOW_DAYS = 30
+
+
+def refresh_karigar_stats(db, days: int = STATS_WINDOW_DAYS):
+    """Rebuild employee_stats from order status history.
+
+    A stage is attributed to the employee on the history event that
+    started it, and lasts until the order's next event. Reassigning an
+    order mid-stage (PUT /orders/{id}/assign) adds an "assigned" event,
+    so the stage is finished, and credited, by the new karigar only. For
+    every employee we store how many stages they finished in the window
+    and their average hours per stage. Meant to run daily (see
+    scripts/refresh_karigar_stats.py) so the assignment screen only
+    reads a handful of small documents.
+    """
+    now = datetime.utcnow()
+    since = now - timedelta(days=days)
+
+    pipeline = [
+        {"$match": {"status_history.changed_at": {"$gte": since}}},
+        {"$project": {"status_history": 1}},
+        {"$unwind": "$status_history"},
+        {
+            "$replaceWith": {
+                "order_id": "$_id",
+                "status": "$status_history.status",
+                "employee_id": "$status_history.employee_id",
+                "changed_at": "$status_history.changed_at",
+                "assigned": "$status_history.assigned"
+            }
+        },
+        # End of each stage = the next event on the same order
+        {
+            "$setWindowFields": {
+                "partitionBy": "$order_id",
+                "sortBy": {"changed_at": 1},
+                "output": {
+                    "ended_at": {"$shift": {"output": "$changed_at", "by": 1}},
+                    "handed_over": {"$shift": {"output": "$assigned", "by": 1}}
+                }
+            }
+        },
+        {
+            "$match": {
+                "employee_id": {"$ne": None},
+                "ended_at": {"$gte": since},
+                "handed_over": {"$ne": True}
+            }
+        },
+        {
+            "$group": {
+                "_id": {"employee_id": "$employee_id", "status": "$status"},
+                "completed": {"$sum": 1},
+                "avg_hours": {
+                    "$avg": {"$divide": [{"$subtract": ["$ended_at", "$changed_at"]}, 3600000]}
+                }
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.employee_id",
+                "completed": {"$sum": "$completed"},
+                "stages": {
+                    "$push": {
+                        "status": "$_id.status",
+                        "completed": "$completed",
+                        "avg_hours": {"$round": ["$avg_hours", 2]}
+                    }
+                }
+            }
+        },
+        {
+            "$addFields": {
+                "window_days": days,
+                "per_day": {"$round": [{"$divide": ["$completed", days]}, 2]},
+                "computed_at": now
+            }
+        },
+        {"$merge": {"into": "employee_stats", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+    db.orders.aggregate(pipeline)
+
+    # Employees with no finished stage in the window drop out of the stats
+    db.employee_stats.delete_many({"computed_at": {"$lt": now}})
+
+    return db.employee_stats.count_documents({})
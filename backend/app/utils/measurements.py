@@ -0,0 +1,60 @@
+import copy
+import hashlib
+import json
+from datetime import datetime
+from functools import lru_cache
+
+from app.core.database import get_db
+
+
+def normalize_measurements(measurements: dict | None) -> dict:
+    """Canonical form used for hashing: trimmed keys/values, blanks dropped."""
+    normalized = {}
+    for key, value in (measurements or {}).items():
+        key = str(key).strip()
+        if isinstance(value, str):
+            value = value.strip()
+        if not key or value in ("", None):
+            continue
+        normalized[key] = value
+    return normalized
+
+
+def measurements_hash(normalized: dict) -> str:
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def store_measurement_set(db, measurements: dict | None) -> str | None:
+    """Store a measurement dict once and return its content hash.
+
+    Identical measurements (e.g. ten shirts for the same regular customer)
+    resolve to the same `measurement_sets` document.
+    """
+    normalized = normalize_measurements(measurements)
+    if not normalized:
+        return None
+
+    digest = measurements_hash(normalized)
+    db.measurement_sets.update_one(
+        {"_id": digest},
+        {"$setOnInsert": {"measurements": normalized, "created_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return digest
+
+
+@lru_cache(maxsize=2048)
+def _load_measurement_set(digest: str) -> dict | None:
+    # Content-addressed sets never change, so caching them is always safe
+    doc = get_db().measurement_sets.find_one({"_id": digest})
+    return doc["measurements"] if doc else None
+
+
+def resolve_measurements(order: dict) -> dict | None:
+    """Measurements for an order, whether stored by reference or inline."""
+    digest = order.get("measurements_ref")
+    if digest:
+        found = _load_measurement_set(digest)
+        return copy.deepcopy(found) if found is not None else None
+    return order.get("measurements_snapshot")
@@ -0,0 +1,28 @@
+from pymongo import UpdateOne
+
+
+def order_balance_update(amount: float) -> list:
+    """Update pipeline adding `amount` to an order's paid_total.
+
+    Runs as a single-document update, so concurrent payments against the
+    same order can't lose each other. `balance` is recomputed from price
+    in the same write; orders created before balances existed start from
+    zero until the backfill script has run. Callers pair it with the
+    payment write in run_transaction().
+    """
+    return [
+        {"$set": {"paid_total": {"$add": [{"$ifNull": ["$paid_total", 0]}, amount]}}},
+        {"$set": {"balance": {"$subtract": [{"$ifNull": ["$price", 0]}, "$paid_total"]}}},
+    ]
+
+
+def apply_order_payment(db, order_id, amount: float, session=None):
+    db.orders.update_one({"_id": order_id}, order_balance_update(amount), session=session)
+
+
+def order_payment_ops(amounts: dict) -> list:
+    """bulk_write ops for {order_id: amount}, one per order."""
+    return [
+        UpdateOne({"_id": order_id}, order_balance_update(amount))
+        for order_id, amount in amounts.items()
+    ]
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+
+# <sha256>.<ext>, optionally under a variant folder (thumb/, preview/)
+HASHED_NAME = re.compile(r"^(?:[a-z]+/)?(?P<digest>[0-9a-f]{64})\.[a-z0-9]+$")
+
+# Precompressed siblings we are willing to serve, in preference order
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+@dataclass
+class PhotoEntry:
+    name: str
+    path: str
+    stat: os.stat_result
+    etag: str
+    media_type: str
+    immutable: bool
+    encodings: dict = field(default_factory=dict)  # encoding -> (path, stat)
+
+
+_manifest: dict[str, PhotoEntry] = {}
+
+
+def _media_type(name: str) -> str:
+    ext = name.rsplit(".", 1)[-1].lower()
+    return MEDIA_TYPES.get(ext, "application/octet-stream")
+
+
+def _etag(name: str, size: int, mtime: float) -> str:
+    match = HASHED_NAME.match(name)
+    if match:
+        # content hash is the strongest validator we can get
+        variant = name.split("/", 1)[0] if "/" in name else "orig"
+        return f'"{match.group("digest")}-{variant}"'
+    return '"' + hashlib.sha1(f"{name}:{size}:{mtime}".encode()).hexdigest() + '"'
+
+
+def _entry(name: str) -> PhotoEntry | None:
+    root = os.path.realpath(settings.PHOTO_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        return None  # ../ or a symlink pointing out of PHOTO_DIR
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    encodings = {}
+    for encoding, suffix in ENCODINGS.items():
+        try:
+            encodings[encoding] = (path + suffix, os.stat(path + suffix))
+        except OSError:
+            pass
+
+    return PhotoEntry(
+        name=name,
+        path=path,
+        stat=st,
+        etag=_etag(name, st.st_size, st.st_mtime),
+        media_type=_media_type(name),
+        immutable=bool(HASHED_NAME.match(name)),
+        encodings=encodings,
+    )
+
+
+def build_photo_manifest():
+    """Walk PHOTO_DIR once so requests never have to stat the filesystem."""
+    _manifest.clear()
+    root = settings.PHOTO_DIR
+    if not os.path.isdir(root):
+        return
+
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith((".part", *ENCODINGS.values())):
+                continue
+            name = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, "/")
+            entry = _entry(name)
+            if entry:
+                _manifest[name] = entry
+
+
+def register_photo(name: str):
+    entry = _entry(name)
+    if entry:
+        _manifest[name] = entry
+
+
+def lookup_photo(name: str) -> PhotoEntry | None:
+    entry = _manifest.get(name)
+    if entry is None and HASHED_NAME.match(name):
+        # Written by another worker, or before the background build
+        # reached it. Only content-addressed names: anything else must
+        # have come from the directory walk.
+        entry = _entry(name)
+        if entry:
+            _manifest[name] = entry
+    return entry
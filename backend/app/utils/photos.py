@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import mimetypes
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.utils.storage import get_photo_storage
+
+CHUNK_SIZE = 64 * 1024
+
+# Multipart boundaries and part headers around the photo itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+
+# variant name -> longest edge in pixels
+VARIANTS = {
+    "thumb": 160,
+    "preview": 640,
+}
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_photo_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned, not forked: this worker already runs pymongo's monitor
+        # threads and the threadpool, and a forked child could inherit
+        # one of their locks held
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PHOTO_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_photo_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def photo_extension(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported photo type")
+    return "jpg" if ext == "jpeg" else ext
+
+
+def photo_name(digest: str, ext: str) -> str:
+    return f"{digest}.{ext}"
+
+
+def variant_name(digest: str, variant: str) -> str:
+    return f"{variant}/{digest}.jpg"
+
+
+async def stream_to_disk(file: UploadFile, directory: str) -> tuple[str, str, int]:
+    """Copy an upload into a temp file in chunks, hashing as we go.
+
+    Returns (temp_path, sha256 hex digest, size). Raises 413 once the
+    file part exceeds the configured maximum. By then Starlette has
+    already received the whole request body; PhotoUploadRoute is what
+    stops oversized bodies before they are read.
+    """
+    await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = await run_in_threadpool(tempfile.mkstemp, dir=directory, suffix=".part")
+    out = os.fdopen(fd, "wb")
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.PHOTO_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Photo exceeds {settings.PHOTO_MAX_BYTES // (1024 * 1024)} MB limit"
+                )
+            hasher.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+        await run_in_threadpool(out.close)
+    except BaseException:
+        out.close()
+        await run_in_threadpool(os.remove, tmp_path)
+        raise
+
+    if size == 0:
+        await run_in_threadpool(os.remove, tmp_path)
+        raise HTTPException(status_code=400, detail="Empty photo")
+
+    return tmp_path, hasher.hexdigest(), size
+
+
+class PhotoUploadRoute(APIRoute):
+    """Rejects oversized photo uploads from Content-Length.
+
+    FastAPI parses (and spools) the multipart form before any dependency
+    or endpoint code runs, so the check has to sit in the route handler
+    itself to keep oversized bodies from being read at all.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            length = request.headers.get("content-length")
+            if length is None:
+                raise HTTPException(status_code=411, detail="Content-Length required")
+            if not length.isdigit() or int(length) > settings.PHOTO_MAX_BYTES + UPLOAD_OVERHEAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Photo exceeds {settings.PHOTO_MAX_BYTES // (1024 * 1024)} MB limit"
+                )
+            return await handler(request)
+
+        return limited_handler
+
+
+def build_variants(source_path: str, directory: str, digest: str):
+    """Write downscaled JPEG variants. Runs inside the photo process pool."""
+    # Imported here so only the pool processes pay for loading Pillow
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        for variant, edge in VARIANTS.items():
+            target = os.path.join(directory, variant_name(digest, variant))
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                copy = img.copy()
+                copy.thumbnail((edge, edge))
+                copy.save(target, "JPEG", quality=82, optimize=True, progressive=True)
+
+
+async def save_photo(file: UploadFile) -> dict:
+    """Persist an upload under its content hash and generate its variants.
+
+    Identical uploads resolve to the same object, so re-uploading a photo
+    costs a hash and nothing else.
+    """
+    storage = get_photo_storage()
+    ext = photo_extension(file.filename)
+    tmp_path, digest, size = await stream_to_disk(file, storage.staging_dir)
+
+    name = photo_name(digest, ext)
+    variants = {v: variant_name(digest, v) for v in VARIANTS}
+
+    if await run_in_threadpool(storage.exists, name):
+        await run_in_threadpool(os.remove, tmp_path)
+        return {"hash": digest, "size": size, "original": name, "variants": variants}
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            get_photo_pool(), build_variants, tmp_path, storage.staging_dir, digest
+        )
+    except Exception:
+        await run_in_threadpool(os.remove, tmp_path)
+        raise HTTPException(status_code=400, detail="Could not read image")
+
+    # Variants first: `exists(original)` is the dedupe check above
+    for variant in variants.values():
+        await run_in_threadpool(
+            storage.put, os.path.join(storage.staging_dir, variant), variant, "image/jpeg"
+        )
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    await run_in_threadpool(storage.put, tmp_path, name, content_type)
+
+    return {
+        "hash": digest,
+        "size": size,
+        "original": name,
+        "variants": variants,
+    }
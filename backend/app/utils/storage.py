@@ -0,0 +1,130 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+
+from app.core.config import settings
+from app.utils.photo_manifest import lookup_photo, register_photo
+
+
+class PhotoStorage(ABC):
+    """Where photo bytes live once an upload has been hashed.
+
+    Uploads are always staged on local disk first (hashing and variant
+    generation need a real file); `put` then hands the staged file over.
+    """
+
+    # Directory uploads are streamed into before `put`
+    staging_dir: str
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, local_path: str, name: str, content_type: str):
+        ...
+
+    def presigned_url(self, name: str) -> str | None:
+        """Direct URL for clients, or None to serve through the API."""
+        return None
+
+
+class LocalPhotoStorage(PhotoStorage):
+    def __init__(self, root: str):
+        self.root = root
+        # Same filesystem as the final location, so `put` is a rename
+        self.staging_dir = root
+
+    def exists(self, name: str) -> bool:
+        return lookup_photo(name) is not None
+
+    def put(self, local_path: str, name: str, content_type: str):
+        target = os.path.join(self.root, name)
+        if os.path.abspath(local_path) != os.path.abspath(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(local_path, target)
+        register_photo(name)
+
+
+class S3PhotoStorage(PhotoStorage):
+    """S3-compatible object storage (AWS S3, MinIO, R2, ...).
+
+    Requires boto3. Point S3_ENDPOINT_URL at a local MinIO for development.
+    """
+
+    def __init__(self):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("PHOTO_STORAGE=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = settings.S3_BUCKET
+        self.prefix = settings.S3_PREFIX
+        self.staging_dir = tempfile.gettempdir()
+        self._client_error = ClientError
+
+        # One client per process; botocore keeps a pooled connection set
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": 3, "mode": "standard"},
+                signature_version="s3v4",
+            ),
+        )
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+            return True
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, local_path: str, name: str, content_type: str):
+        # Photos are capped at PHOTO_MAX_BYTES, well under what needs a
+        # multipart upload, so one PUT does it
+        try:
+            with open(local_path, "rb") as f:
+                self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key(name),
+                    Body=f,
+                    ContentType=content_type,
+                    # keys are content hashes, so objects never change
+                    CacheControl="public, max-age=31536000, immutable",
+                )
+        finally:
+            os.remove(local_path)
+
+    def presigned_url(self, name: str) -> str | None:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.key(name)},
+            ExpiresIn=settings.S3_PRESIGN_EXPIRES,
+        )
+
+
+_storage: PhotoStorage | None = None
+
+
+def get_photo_storage() -> PhotoStorage:
+    global _storage
+    if _storage is None:
+        if settings.PHOTO_STORAGE == "s3":
+            _storage = S3PhotoStorage()
+        elif settings.PHOTO_STORAGE == "local":
+            _storage = LocalPhotoStorage(settings.PHOTO_DIR)
+        else:
+            raise RuntimeError(f"Unknown PHOTO_STORAGE: {settings.PHOTO_STORAGE}")
+    return _storage
@@ -0,0 +1,68 @@
+import codecs
+import csv
+import os
+
+from fastapi import HTTPException, UploadFile
+
+
+def _csv_rows(file: UploadFile):
+    # Decode incrementally off the spooled upload; nothing is read up front
+    reader = csv.reader(codecs.iterdecode(file.file, "utf-8-sig"))
+    for row in reader:
+        yield row
+
+
+def _xlsx_rows(file: UploadFile):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(
+            status_code=400,
+            detail="XLSX import is not available on this server, upload a CSV instead"
+        )
+
+    # read_only streams rows instead of building the whole sheet in memory
+    workbook = load_workbook(file.file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ["" if v is None else str(v) for v in row]
+    finally:
+        workbook.close()
+
+
+def iter_upload_rows(file: UploadFile):
+    """Yield (row_number, {header: value}) for a CSV or XLSX upload.
+
+    Headers are lower-cased and stripped; fully blank rows are skipped.
+    Row numbers match what the user sees in a spreadsheet (header = 1).
+    """
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    if ext == ".csv":
+        rows = _csv_rows(file)
+    elif ext == ".xlsx":
+        rows = _xlsx_rows(file)
+    else:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file")
+
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise HTTPException(status_code=400, detail="File is empty")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+
+    header = [h.strip().lower() for h in header]
+
+    row_number = 1
+    try:
+        for row in rows:
+            row_number += 1
+            values = [v.strip() for v in row]
+            if not any(values):
+                continue
+            yield row_number, dict(zip(header, values))
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"CSV must be UTF-8 encoded (row {row_number})"
+        )
@@ -0,0 +1,44 @@
+# Multi-worker entry point:
+#
+#   gunicorn -c gunicorn.conf.py
+#
+# Each worker is a uvicorn event loop running app.main:create_app(). The
+# app is built in the worker, not in the master (no preload_app), so the
+# Mongo client, process pools and tracing exporter are all created after
+# the fork. Every worker runs its own background warm-up; index creation
+# is idempotent so that is harmless.
+#
+# Sizing: each worker has its own threadpool, Mongo pool (maxPoolSize),
+# admission limits, PHOTO_WORKERS and BCRYPT_WORKERS processes, so keep
+# WEB_CONCURRENCY at about the number of cores.
+import multiprocessing
+import os
+
+wsgi_app = "app.main:create_app()"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+
+# Slow report queries are bounded by MONGO_TIMEOUTS, well under this
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks can't build up
+max_requests = 10_000
+max_requests_jitter = 1_000
+
+
+def on_starting(server):
+    # Workers share metrics through files; start from a clean directory
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for name in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,118 @@
+import sys
+import os
+
+# Appending the parent directory to sys.path to allow imports from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+
+from app.core.database import get_db
+
+BATCH_SIZE = 500
+
+# Sets paid_total / balance on every order from its advance plus the
+# payments linked to it. Nothing is added to the payments ledger unless
+# asked for:
+#
+#   python scripts/backfill_order_payments.py
+#   python scripts/backfill_order_payments.py --record-advances
+#
+# --record-advances also writes each historical advance into payments
+# (dated when the order was taken, total_bill 0). That changes past
+# daily/monthly income figures, and counts an advance twice wherever
+# staff had already entered it as a payment by hand, so only use it on
+# shops that never did.
+
+
+def backfill_advances(db):
+    """Record a payment for every historical order advance not yet in the ledger."""
+    recorded = set(db.payments.distinct("order_id", {"payment_type": "Advance"}))
+
+    orders = db.orders.find(
+        {"advance_amount": {"$gt": 0}},
+        {"customer_id": 1, "customer_name": 1, "price": 1, "advance_amount": 1,
+         "delivery_date": 1, "created_at": 1}
+    )
+
+    docs = []
+    inserted = 0
+    for order in orders:
+        if order["_id"] in recorded:
+            continue
+        docs.append({
+            "customer_id": order["customer_id"],
+            "order_id": order["_id"],
+            "customer_name": order.get("customer_name"),
+            "total_bill": 0,
+            "paid_amount": order["advance_amount"],
+            "payment_mode": "Cash",
+            "payment_type": "Advance",
+            "due_date": order.get("delivery_date"),
+            "created_at": order.get("created_at"),
+            "created_by": "backfill",
+        })
+        if len(docs) >= BATCH_SIZE:
+            db.payments.insert_many(docs, ordered=False)
+            inserted += len(docs)
+            docs = []
+
+    if docs:
+        db.payments.insert_many(docs, ordered=False)
+        inserted += len(docs)
+
+    return inserted
+
+
+def recompute_balances(db):
+    """Set paid_total / balance on every order from its advance and linked payments.
+
+    An advance counts once: from the ledger when it has been recorded
+    there, from the order's advance_amount otherwise.
+    """
+    balance = {"$set": {"balance": {"$subtract": [{"$ifNull": ["$price", 0]}, "$paid_total"]}}}
+
+    # Start every order from its advance alone...
+    updated = db.orders.update_many({}, [
+        {"$set": {"paid_total": {"$ifNull": ["$advance_amount", 0]}}},
+        balance,
+    ]).modified_count
+
+    # ...then add what was paid against it
+    recorded = set(db.payments.distinct("order_id", {"payment_type": "Advance"}))
+    totals = db.payments.aggregate([
+        {"$match": {"order_id": {"$ne": None}}},
+        {"$group": {"_id": "$order_id", "paid_total": {"$sum": "$paid_amount"}}}
+    ])
+
+    ops = []
+    for t in totals:
+        advance = 0 if t["_id"] in recorded else {"$ifNull": ["$advance_amount", 0]}
+        ops.append(UpdateOne({"_id": t["_id"]}, [
+            {"$set": {"paid_total": {"$add": [t["paid_total"], advance]}}},
+            balance,
+        ]))
+        if len(ops) >= BATCH_SIZE:
+            db.orders.bulk_write(ops, ordered=False)
+            ops = []
+
+    if ops:
+        db.orders.bulk_write(ops, ordered=False)
+
+    return updated
+
+
+def backfill_order_payments(record_advances: bool):
+    db = get_db()
+
+    if record_advances:
+        print("Recording historical order advances as payments...")
+        print(f"Inserted {backfill_advances(db)} advance payments.")
+
+    # Customer-level payments recorded before order linkage existed can't
+    # be attributed to an order reliably, so they stay unlinked.
+    print("Recomputing order balances...")
+    print(f"Updated {recompute_balances(db)} orders.")
+
+
+if __name__ == "__main__":
+    backfill_order_payments(record_advances="--record-advances" in sys.argv)
@@ -0,0 +1,103 @@
+import sys
+import os
+import json
+import socket
+import statistics
+import subprocess
+import time
+import urllib.request
+from datetime import datetime
+
+# Measures cold start in fresh interpreters, so nothing from app is
+# imported here:
+#   import    time to `import app.main` (should stay small, nothing is built)
+#   create    time to import everything and build the app (create_app())
+#   ready     process start until /health answers 200
+#   warm      process start until /health reports the warm-up as done
+#
+#   python scripts/bench_startup.py [runs] [results.jsonl]
+#
+# With a results file, each run's medians are appended as one JSON line so
+# regressions show up over time.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT = 60
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import app.main
+imported = time.perf_counter() - t
+app.main.create_app()
+print(imported, time.perf_counter() - t)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> tuple[float, float]:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    imported, created = out.split()
+    return float(imported), float(created)
+
+
+def measure_ready() -> tuple[float, float]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:create_app", "--factory",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    ready = None
+    try:
+        while time.perf_counter() - started < READY_TIMEOUT:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    body = json.load(response)
+            except OSError:
+                time.sleep(0.01)
+                continue
+            if ready is None:
+                ready = time.perf_counter() - started
+            if body.get("warm"):
+                return ready, time.perf_counter() - started
+            time.sleep(0.01)
+        raise RuntimeError(f"Server not warm after {READY_TIMEOUT}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_startup(runs: int) -> dict:
+    samples = {"import": [], "create": [], "ready": [], "warm": []}
+    for _ in range(runs):
+        imported, created = measure_import()
+        ready, warm = measure_ready()
+        samples["import"].append(imported)
+        samples["create"].append(created)
+        samples["ready"].append(ready)
+        samples["warm"].append(warm)
+    return {name: round(statistics.median(values), 3) for name, values in samples.items()}
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    result = bench_startup(runs)
+
+    for name, seconds in result.items():
+        print(f"{name:>7}: {seconds * 1000:8.1f} ms (median of {runs})")
+
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "a", encoding="utf-8") as f:
+            f.write(json.dumps({"at": datetime.utcnow().isoformat(), "runs": runs, **result}) + "\n")
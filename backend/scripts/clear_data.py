@@ -16,7 +16,11 @@ def clear_db():
         "payments",
         "expenses",
         "owners",
-        "messages"
+        "messages",
+        "measurement_sets",
+        "owner_transactions",
+        "employee_payments",
+        "employee_stats"
     ]
     
     print("WARNING: This will delete all data from the following collections:")
@@ -0,0 +1,75 @@
+import sys
+import os
+
+# Appending the parent directory to sys.path to allow imports from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+from app.core.database import get_db
+from app.core.indexes import MOBILE_PRESENT, ensure_unique_mobile
+
+# Merges customers that share a mobile number so customers.mobile can
+# get its unique index. Per mobile the active, oldest customer is kept;
+# orders and payments of the others are moved onto it, measurements it
+# lacks are copied over, and the others are moved to customers_merged
+# (with merged_into) rather than deleted outright.
+#
+#   python scripts/dedupe_customers.py            # report only
+#   python scripts/dedupe_customers.py --apply
+
+REFERENCING_COLLECTIONS = ("orders", "payments")
+
+
+def dedupe_customers(apply: bool):
+    db = get_db()
+
+    groups = db.customers.aggregate([
+        {"$match": MOBILE_PRESENT},  # customers without a mobile aren't duplicates
+        {"$sort": {"is_active": -1, "created_at": 1, "_id": 1}},
+        {"$group": {"_id": "$mobile", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ], allowDiskUse=True)
+
+    merged = 0
+    for group in groups:
+        keep_id, *duplicate_ids = group["ids"]
+        print(f"{group['_id']}: keeping {keep_id}, merging {len(duplicate_ids)}")
+        if not apply:
+            continue
+
+        keeper = db.customers.find_one({"_id": keep_id})
+        duplicates = list(db.customers.find({"_id": {"$in": duplicate_ids}}))
+
+        measurements = {}
+        for duplicate in duplicates:
+            measurements.update(duplicate.get("measurements") or {})
+        measurements.update(keeper.get("measurements") or {})
+        if measurements:
+            db.customers.update_one({"_id": keep_id}, {"$set": {"measurements": measurements}})
+
+        for collection in REFERENCING_COLLECTIONS:
+            db[collection].update_many(
+                {"customer_id": {"$in": duplicate_ids}},
+                {"$set": {"customer_id": keep_id}}
+            )
+
+        now = datetime.utcnow()
+        for duplicate in duplicates:
+            duplicate.update({"merged_into": keep_id, "merged_at": now})
+        db.customers_merged.insert_many(duplicates)
+        db.customers.delete_many({"_id": {"$in": duplicate_ids}})
+        merged += len(duplicates)
+
+    if not apply:
+        print("Dry run, nothing changed. Re-run with --apply to merge.")
+        return
+
+    print(f"Merged {merged} duplicate customers.")
+    ensure_unique_mobile(db)
+    unique = db.customers.index_information().get("mobile_1", {}).get("unique", False)
+    print("customers.mobile index is unique." if unique else "customers.mobile index is still not unique.")
+
+
+if __name__ == "__main__":
+    dedupe_customers(apply="--apply" in sys.argv)
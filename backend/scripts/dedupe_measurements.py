@@ -0,0 +1,49 @@
+import sys
+import os
+
+# Appending the parent directory to sys.path to allow imports from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+
+from app.core.database import get_db
+from app.utils.measurements import store_measurement_set
+
+BATCH_SIZE = 500
+
+
+def dedupe_measurements():
+    db = get_db()
+
+    orders = db.orders.find(
+        {"measurements_snapshot": {"$exists": True}},
+        {"measurements_snapshot": 1}
+    )
+
+    print("Moving inline measurement snapshots into measurement_sets...")
+
+    ops = []
+    migrated = 0
+    for order in orders:
+        digest = store_measurement_set(db, order.get("measurements_snapshot"))
+        ops.append(UpdateOne(
+            {"_id": order["_id"]},
+            {
+                "$set": {"measurements_ref": digest},
+                "$unset": {"measurements_snapshot": ""}
+            }
+        ))
+        if len(ops) >= BATCH_SIZE:
+            db.orders.bulk_write(ops, ordered=False)
+            migrated += len(ops)
+            ops = []
+
+    if ops:
+        db.orders.bulk_write(ops, ordered=False)
+        migrated += len(ops)
+
+    print(f"Migrated {migrated} orders into {db.measurement_sets.count_documents({})} measurement sets.")
+
+
+if __name__ == "__main__":
+    dedupe_measurements()
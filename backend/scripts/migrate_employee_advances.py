@@ -0,0 +1,63 @@
+import sys
+import os
+
+# Appending the parent directory to sys.path to allow imports from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+from app.core.database import get_db
+
+# Advances paid before the employee_payments ledger existed only live in
+# employees.advance_paid, so payroll never nets them. This writes the
+# difference between the counter and the ledger's unsettled advances as
+# one "advance" entry in the given month (default: the current one), so
+# the next payroll settlement deducts it. Safe to re-run: once carried
+# over, the difference is zero.
+#
+#   python scripts/migrate_employee_advances.py [YYYY-MM]
+
+
+def unsettled_ledger_advances(db) -> dict:
+    """employee id -> advances in months that have no salary settlement yet."""
+    settled = {
+        (p["employee_id"], p["month"])
+        for p in db.employee_payments.find({"kind": "salary"}, {"employee_id": 1, "month": 1})
+    }
+    totals = {}
+    for p in db.employee_payments.find({"kind": "advance"}, {"employee_id": 1, "month": 1, "amount": 1}):
+        if (p["employee_id"], p["month"]) not in settled:
+            totals[p["employee_id"]] = totals.get(p["employee_id"], 0) + p["amount"]
+    return totals
+
+
+def migrate_employee_advances(month: str):
+    db = get_db()
+    datetime.strptime(month, "%Y-%m")  # validate
+
+    ledger = unsettled_ledger_advances(db)
+    now = datetime.utcnow()
+
+    entries = []
+    for employee in db.employees.find({"advance_paid": {"$gt": 0}}, {"name": 1, "advance_paid": 1}):
+        legacy = employee["advance_paid"] - ledger.get(employee["_id"], 0)
+        if legacy > 0:
+            entries.append({
+                "employee_id": employee["_id"],
+                "employee_name": employee["name"],
+                "kind": "advance",
+                "amount": legacy,
+                "month": month,
+                "at": now,
+                "note": "Carried over from before the advance ledger",
+                "created_by": "migration"
+            })
+
+    if entries:
+        db.employee_payments.insert_many(entries)
+    print(f"Carried {len(entries)} legacy advance balances into {month} "
+          f"({sum(e['amount'] for e in entries)} in total).")
+
+
+if __name__ == "__main__":
+    migrate_employee_advances(sys.argv[1] if len(sys.argv) > 1 else datetime.utcnow().strftime("%Y-%m"))
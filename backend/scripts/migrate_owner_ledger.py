@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Appending the parent directory to sys.path to allow imports from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import get_db
+
+# Old partner movements were written into expenses with these types
+EQUITY_EXPENSE_TYPES = {"Withdrawal": ("withdrawal", -1), "Deposit": ("deposit", 1)}
+
+
+def migrate_owner_ledger():
+    db = get_db()
+
+    print("Moving partner withdrawals/deposits from expenses to owner_transactions...")
+
+    rows = list(db.expenses.find({"expense_type": {"$in": list(EQUITY_EXPENSE_TYPES)}}))
+    ledger = []
+    for row in rows:
+        kind, sign = EQUITY_EXPENSE_TYPES[row["expense_type"]]
+        ledger.append({
+            "owner_id": row.get("owner_id"),
+            "owner_name": row.get("owner_name"),
+            "type": kind,
+            "amount": row["amount"],
+            "signed_amount": sign * row["amount"],
+            "note": row.get("description", ""),
+            "at": row["created_at"],
+            "created_by": row.get("created_by")
+        })
+
+    if ledger:
+        db.owner_transactions.insert_many(ledger)
+        db.expenses.delete_many({"_id": {"$in": [r["_id"] for r in rows]}})
+    print(f"Moved {len(ledger)} entries.")
+
+    print("Adding opening investment entries...")
+    has_investment = set(db.owner_transactions.distinct("owner_id", {"type": "investment"}))
+    opening = [
+        {
+            "owner_id": o["_id"],
+            "owner_name": o["name"],
+            "type": "investment",
+            "amount": o["initial_investment"],
+            "signed_amount": o["initial_investment"],
+            "note": "Initial investment",
+            "at": o.get("joined_date") or o["created_at"],
+            "created_by": "migration"
+        }
+        for o in db.owners.find({"initial_investment": {"$gt": 0}})
+        if o["_id"] not in has_investment
+    ]
+    if opening:
+        db.owner_transactions.insert_many(opening)
+    print(f"Added {len(opening)} investment entries.")
+
+
+if __name__ == "__main__":
+    migrate_owner_ledger()
@@ -0,0 +1,16 @@
+import sys
+import os
+
+# Appending the parent directory to sys.path to allow imports from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import get_db
+from app.utils.karigar_stats import refresh_karigar_stats
+
+# Run once a day, e.g. from cron:
+#   0 2 * * * cd /path/to/backend && python scripts/refresh_karigar_stats.py
+
+
+if __name__ == "__main__":
+    count = refresh_karigar_stats(get_db())
+    print(f"Karigar stats refreshed for {count} employees.")
@@ -19,3 +19,17 @@ export const deleteCustomer = async (id) => {
   const res = await api.delete(`/customers/${id}`);
   return res.data;
 };
+
+export const fetchCustomerOverview = async (id, params = {}) => {
+  const res = await api.get(`/customers/${id}/overview`, { params });
+  return res.data;
+};
+
+export const importCustomers = async (file) => {
+  const formData = new FormData();
+  formData.append("file", file);
+  const res = await api.post("/customers/import", formData, {
+    headers: { "Content-Type": "multipart/form-data" },
+  });
+  return res.data;
+};
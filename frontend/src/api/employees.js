@@ -29,3 +29,22 @@ export const getEmployeeStatus = async (id) => {
   const res = await api.get(`/employees/${id}/status`);
   return res.data;
 };
+
+export const fetchPayroll = async (month, workingDays = null) => {
+  const params = { month };
+  if (workingDays !== null) params.working_days = workingDays;
+  const res = await api.get("/employees/payroll", { params });
+  return res.data;
+};
+
+export const settlePayroll = async (month, paymentMode = "Cash") => {
+  const res = await api.post("/employees/payroll/settle", null, {
+    params: { month, payment_mode: paymentMode },
+  });
+  return res.data;
+};
+
+export const fetchKarigarStats = async () => {
+  const res = await api.get("/employees/stats");
+  return res.data;
+};
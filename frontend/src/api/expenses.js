@@ -29,3 +29,11 @@ export const getMonthlySummary = async (year, month, expense_type = null) => {
     const res = await api.get(`/expenses/monthly-summary?${params.toString()}`);
     return res.data;
 };
+
+export const getExpensePivot = async (start, end, granularity = "month", expense_type = null) => {
+    const params = new URLSearchParams({ start, end, granularity });
+    if (expense_type) params.append("expense_type", expense_type);
+
+    const res = await api.get(`/expenses/pivot?${params.toString()}`);
+    return res.data;
+};
@@ -24,3 +24,29 @@ export const markOrderReady = async (id, confirm = true) => {
     });
     return res.data;
 };
+
+export const assignOrder = async (id, employeeId) => {
+    const res = await api.put(`/orders/${id}/assign`, null, {
+        params: { employee_id: employeeId },
+    });
+    return res.data;
+};
+
+export const fetchWorkload = async () => {
+    const res = await api.get("/orders/workload");
+    return res.data;
+};
+
+export const bulkUpdateOrderStatus = async (orderIds, status, options = {}) => {
+    const res = await api.post("/orders/bulk-status", {
+        order_ids: orderIds,
+        status,
+        ...options,
+    });
+    return res.data;
+};
+
+export const fetchOrderBoard = async (params = {}) => {
+    const res = await api.get("/orders/board", { params });
+    return res.data;
+};
@@ -29,3 +29,13 @@ export const recordDeposit = async (id, amount, note) => {
     const res = await api.post(`/owners/${id}/deposit`, { amount, note });
     return res.data;
 };
+
+export const fetchOwnerLedger = async (id, limit = 100) => {
+    const res = await api.get(`/owners/${id}/ledger`, { params: { limit } });
+    return res.data;
+};
+
+export const fetchProfitDistribution = async (year) => {
+    const res = await api.get("/owners/profit-distribution", { params: { year } });
+    return res.data;
+};
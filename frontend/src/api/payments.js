@@ -32,3 +32,18 @@ export const deletePayment = async (id) => {
   const res = await api.delete(`/payments/${id}`);
   return res.data;
 };
+
+export const fetchDuesAging = async (params = {}) => {
+  const res = await api.get("/payments/aging", { params });
+  return res.data;
+};
+
+export const fetchOverdueCustomers = async (minDays = 0) => {
+  const data = await fetchDuesAging({ include_customers: true, min_days: minDays });
+  return data.customers;
+};
+
+export const createPaymentsBatch = async (payments) => {
+  const res = await api.post("/payments/batch", { payments });
+  return res.data;
+};
@@ -0,0 +1,6 @@
+import api from "./api";
+
+export const globalSearch = async (q, limit = 5) => {
+  const res = await api.get("/search", { params: { q, limit } });
+  return res.data;
+};
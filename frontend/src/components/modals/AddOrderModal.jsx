@@ -80,15 +80,7 @@ export default function AddOrderModal({ onClose, onSuccess }) {
         delivery_date: deliveryDate,
         priority: "Normal",
         advance_amount: Number(advance) || 0, // Store advance in order for invoice
-      });
-
-
-      // 2️⃣ Record Payment (Debt + Advance)
-      // Always create a payment record to establish the Total Bill (Debt)
-      await api.post("/payments", {
-        customer_id: customerId,
-        total_bill: Number(totalPrice),     // The full cost of the suit
-        paid_amount: Number(advance) || 0,  // What they paid now (can be 0)
+        // The server records the bill (debt) and the advance as one payment
         payment_mode: paymentMode,
       });
 
@@ -91,9 +91,9 @@ export default function Invoice() {
                         <tr>
                             <td className="py-4 px-4 align-top font-bold text-lg text-slate-900 dark:text-white print:text-black">{order.order_type}</td>
                             <td className="py-4 px-4 text-slate-600 dark:text-slate-400 text-sm print:text-slate-600">
-                                {order.measurements ? (
+                                {order.measurements_snapshot ? (
                                     <div className="grid grid-cols-2 gap-x-4 gap-y-1">
-                                        {Object.entries(order.measurements).map(([k, v]) => (
+                                        {Object.entries(order.measurements_snapshot).map(([k, v]) => (
                                             <span key={k}><span className="font-semibold capitalize">{k}:</span> {v}</span>
                                         ))}
                                     </div>
@@ -118,13 +118,13 @@ export default function Invoice() {
                             <span>₹ {order.price || 0}</span>
                         </div>
                         <div className="flex justify-between text-slate-600 dark:text-slate-400 print:text-slate-600">
-                            <span>Advance Paid</span>
-                            <span className="text-green-600 dark:text-green-400 print:text-green-600">- ₹ {order.advance_amount || 0}</span>
+                            <span>Paid</span>
+                            <span className="text-green-600 dark:text-green-400 print:text-green-600">- ₹ {order.paid_total ?? order.advance_amount ?? 0}</span>
                         </div>
                         <div className="border-t border-slate-200 dark:border-slate-700 pt-3 flex justify-between items-center print:border-slate-200">
                             <span className="font-bold text-lg text-slate-900 dark:text-white print:text-black">Total Due</span>
                             <span className="font-black text-2xl text-slate-900 dark:text-white print:text-black">
-                                ₹ {Math.max(0, (order.price || 0) - (order.advance_amount || 0))}
+                                ₹ {Math.max(0, order.balance ?? ((order.price || 0) - (order.advance_amount || 0)))}
                             </span>
                         </div>
                     </div>
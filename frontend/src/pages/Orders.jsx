@@ -84,7 +84,7 @@ export default function Orders() {
         if (window.confirm("Order marked as Ready. Send WhatsApp notification to customer?")) {
           const price = selectedOrder.price || 0;
           const advance = selectedOrder.advance_amount || 0;
-          const pending = Math.max(0, price - advance);
+          const pending = Math.max(0, selectedOrder.balance ?? price - advance);
 
           let msg = templates.order_ready
             .replace("{customer_name}", selectedOrder.customer_name || "Customer")